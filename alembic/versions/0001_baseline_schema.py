@@ -0,0 +1,138 @@
+"""Baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 02:40:51.704192
+
+Tables as they were created by Base.metadata.create_all() before Alembic
+was introduced. Databases created that way should be marked with
+`alembic stamp 0001` instead of running this revision.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('schedules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('schedule_type', sa.String(), nullable=True),
+    sa.Column('schedule_data', sa.JSON(), nullable=True),
+    sa.Column('content_queue', sa.JSON(), nullable=True),
+    sa.Column('current_index', sa.Integer(), nullable=True),
+    sa.Column('target_platforms', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_executed', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('next_execution', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_schedules_id'), 'schedules', ['id'], unique=False)
+    op.create_table('social_accounts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('platform', sa.String(), nullable=True),
+    sa.Column('account_name', sa.String(), nullable=True),
+    sa.Column('access_token', sa.Text(), nullable=True),
+    sa.Column('refresh_token', sa.Text(), nullable=True),
+    sa.Column('token_expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_social_accounts_id'), 'social_accounts', ['id'], unique=False)
+    op.create_index(op.f('ix_social_accounts_platform'), 'social_accounts', ['platform'], unique=False)
+    op.create_table('analytics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('social_account_id', sa.Integer(), nullable=True),
+    sa.Column('followers_count', sa.Integer(), nullable=True),
+    sa.Column('following_count', sa.Integer(), nullable=True),
+    sa.Column('posts_count', sa.Integer(), nullable=True),
+    sa.Column('followers_growth', sa.Integer(), nullable=True),
+    sa.Column('engagement_growth', sa.Float(), nullable=True),
+    sa.Column('date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('period_type', sa.String(), nullable=True),
+    sa.Column('platform_metrics', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['social_account_id'], ['social_accounts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analytics_id'), 'analytics', ['id'], unique=False)
+    op.create_table('posts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('social_account_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('file_path', sa.String(), nullable=True),
+    sa.Column('file_type', sa.String(), nullable=True),
+    sa.Column('thumbnail_path', sa.String(), nullable=True),
+    sa.Column('scheduled_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('posted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('platform_post_id', sa.String(), nullable=True),
+    sa.Column('platform_data', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['social_account_id'], ['social_accounts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_posts_id'), 'posts', ['id'], unique=False)
+    op.create_table('post_analytics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=True),
+    sa.Column('views', sa.Integer(), nullable=True),
+    sa.Column('likes', sa.Integer(), nullable=True),
+    sa.Column('comments', sa.Integer(), nullable=True),
+    sa.Column('shares', sa.Integer(), nullable=True),
+    sa.Column('saves', sa.Integer(), nullable=True),
+    sa.Column('reach', sa.Integer(), nullable=True),
+    sa.Column('impressions', sa.Integer(), nullable=True),
+    sa.Column('engagement_rate', sa.Float(), nullable=True),
+    sa.Column('click_through_rate', sa.Float(), nullable=True),
+    sa.Column('collected_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_post_analytics_id'), 'post_analytics', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_post_analytics_id'), table_name='post_analytics')
+    op.drop_table('post_analytics')
+    op.drop_index(op.f('ix_posts_id'), table_name='posts')
+    op.drop_table('posts')
+    op.drop_index(op.f('ix_analytics_id'), table_name='analytics')
+    op.drop_table('analytics')
+    op.drop_index(op.f('ix_social_accounts_platform'), table_name='social_accounts')
+    op.drop_index(op.f('ix_social_accounts_id'), table_name='social_accounts')
+    op.drop_table('social_accounts')
+    op.drop_index(op.f('ix_schedules_id'), table_name='schedules')
+    op.drop_table('schedules')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,34 @@
+"""Add indexes for the hot analytics and posting filters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 03:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Join columns used by analyze_post_performance
+    op.create_index(op.f('ix_posts_user_id'), 'posts', ['user_id'], unique=False)
+    op.create_index(op.f('ix_post_analytics_post_id'), 'post_analytics', ['post_id'], unique=False)
+    
+    # Composite lookups: latest account analytics, latest post analytics,
+    # and platform post id resolution in sync_platform_analytics
+    op.create_index('ix_analytics_social_account_date', 'analytics', ['social_account_id', 'date'], unique=False)
+    op.create_index('ix_post_analytics_post_collected', 'post_analytics', ['post_id', 'collected_at'], unique=False)
+    op.create_index('ix_posts_social_account_platform_post', 'posts', ['social_account_id', 'platform_post_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_social_account_platform_post', table_name='posts')
+    op.drop_index('ix_post_analytics_post_collected', table_name='post_analytics')
+    op.drop_index('ix_analytics_social_account_date', table_name='analytics')
+    op.drop_index(op.f('ix_post_analytics_post_id'), table_name='post_analytics')
+    op.drop_index(op.f('ix_posts_user_id'), table_name='posts')
@@ -0,0 +1,113 @@
+"""Range-partition analytics tables by month on PostgreSQL
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 04:00:00
+
+analytics is partitioned on date and post_analytics on collected_at, with
+one partition per month plus a DEFAULT partition for rows outside the
+prepared range (including NULL keys). cleanup_old_analytics can then drop
+expired months instead of deleting row by row.
+
+PostgreSQL requires primary keys on a partitioned table to include the
+partition key, so the parents keep a plain (non-unique) index on id; ids
+still come from the original sequence. Other databases are left as is.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.partitions import MONTHS_AHEAD, add_months, partition_name
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+TABLES = {
+    'analytics': {
+        'column': 'date',
+        'indexes': {
+            'ix_analytics_id': ['id'],
+            'ix_analytics_social_account_date': ['social_account_id', 'date'],
+        },
+        'foreign_keys': {
+            'user_id': 'users',
+            'social_account_id': 'social_accounts',
+        },
+    },
+    'post_analytics': {
+        'column': 'collected_at',
+        'indexes': {
+            'ix_post_analytics_id': ['id'],
+            'ix_post_analytics_post_id': ['post_id'],
+            'ix_post_analytics_post_collected': ['post_id', 'collected_at'],
+        },
+        'foreign_keys': {
+            'post_id': 'posts',
+        },
+    },
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    for table, spec in TABLES.items():
+        _rebuild(table, spec, partitioned=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    for table, spec in TABLES.items():
+        _rebuild(table, spec, partitioned=False)
+
+
+def _rebuild(table, spec, partitioned):
+    """Copy a table into a partitioned (or plain) replacement under the same name"""
+    
+    bind = op.get_bind()
+    column = spec['column']
+    old = f"{table}_old"
+    
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    
+    if partitioned:
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})")
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        
+        # One partition per month from the oldest row to a few months ahead
+        first = bind.execute(sa.text(f"SELECT min({column}) FROM {old}")).scalar()
+        current = date.today().replace(day=1)
+        month = date(first.year, first.month, 1) if first else current
+        
+        while month <= add_months(current, MONTHS_AHEAD):
+            op.execute(
+                f"CREATE TABLE {partition_name(table, month)} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+            month = add_months(month, 1)
+    else:
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+    
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    
+    # Keep the id sequence alive when the old table is dropped
+    sequence = bind.execute(sa.text(f"SELECT pg_get_serial_sequence('{old}', 'id')")).scalar()
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+    
+    # Dropping a partitioned table drops its partitions too
+    op.execute(f"DROP TABLE {old}")
+    
+    for name, columns in spec['indexes'].items():
+        op.create_index(name, table, columns, unique=False)
+    
+    for local_column, referent in spec['foreign_keys'].items():
+        op.create_foreign_key(f"{table}_{local_column}_fkey", table, referent, [local_column], ['id'])
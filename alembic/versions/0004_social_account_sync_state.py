@@ -0,0 +1,25 @@
+"""Track analytics sync state on social accounts
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 05:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing accounts start dirty so the next beat run syncs them
+    op.add_column('social_accounts', sa.Column('needs_sync', sa.Boolean(), server_default=sa.true(), nullable=True))
+    op.add_column('social_accounts', sa.Column('last_synced_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('social_accounts', 'last_synced_at')
+    op.drop_column('social_accounts', 'needs_sync')
@@ -0,0 +1,23 @@
+"""Index due-post lookups on posts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 06:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # process_scheduled_posts filters on status and a scheduled_time window every minute
+    op.create_index('ix_posts_status_scheduled_time', 'posts', ['status', 'scheduled_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_status_scheduled_time', table_name='posts')
@@ -0,0 +1,22 @@
+"""Store the idempotency key of the request that published a post
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 07:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('posts', 'idempotency_key')
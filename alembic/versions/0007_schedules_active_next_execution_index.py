@@ -0,0 +1,25 @@
+"""Partial index for claiming due schedules
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 08:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_schedules_active_next_execution', 'schedules', ['next_execution'], unique=False,
+        postgresql_where=sa.text('is_active'), sqlite_where=sa.text('is_active')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_schedules_active_next_execution', table_name='schedules')
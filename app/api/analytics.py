@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
+import json
 
 from app.core.database import get_db
 from app.models.models import Analytics, PostAnalytics, Post, SocialAccount
-from app.tasks.analytics_tasks import sync_platform_analytics
+from app.tasks.analytics_tasks import sync_platform_analytics, get_analytics_service
 
 router = APIRouter()
 
@@ -154,6 +156,36 @@ async def get_platform_analytics(
     }
 
 
+@router.get("/platform/{platform}/posts/stream")
+async def stream_platform_posts_analytics(
+    platform: str,
+    user_id: int = 1,  # TODO: Get from authentication
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """Stream live post analytics from the platform as JSON lines"""
+    
+    social_account = db.query(SocialAccount).filter(
+        SocialAccount.user_id == user_id,
+        SocialAccount.platform == platform,
+        SocialAccount.is_active == True
+    ).first()
+    
+    if not social_account:
+        raise HTTPException(status_code=404, detail=f"No active {platform} account found")
+    
+    service = get_analytics_service(platform, social_account)
+    
+    if not service:
+        raise HTTPException(status_code=400, detail=f"Analytics service not available for {platform}")
+    
+    def generate():
+        for analytics in service.iter_posts_analytics(limit):
+            yield json.dumps(analytics, default=str) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.get("/posts/{post_id}")
 async def get_post_analytics(
     post_id: int,
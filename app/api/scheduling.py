@@ -135,7 +135,7 @@ async def schedule_single_post(
         schedule_post_task,
         post.id,
         request.platform_ids,
-        request.scheduled_time
+        request.scheduled_time.isoformat()
     )
     
     return {
@@ -0,0 +1,48 @@
+import json
+from typing import Any, Dict, List, Optional
+import redis
+
+from .config import settings
+
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
+
+
+def get_json(key: str) -> Optional[Any]:
+    """Get a JSON value from the cache, or None on a miss or Redis error"""
+    try:
+        value = redis_client.get(key)
+    except redis.RedisError:
+        return None
+    return json.loads(value) if value is not None else None
+
+
+def get_json_many(keys: List[str]) -> List[Optional[Any]]:
+    """Get several JSON values in one round trip"""
+    if not keys:
+        return []
+    try:
+        values = redis_client.mget(keys)
+    except redis.RedisError:
+        return [None] * len(keys)
+    return [json.loads(value) if value is not None else None for value in values]
+
+
+def set_json(key: str, value: Any, ttl: int):
+    """Store a JSON value with an expiry, ignoring Redis errors"""
+    try:
+        redis_client.setex(key, ttl, json.dumps(value, default=str))
+    except redis.RedisError:
+        pass
+
+
+def set_json_many(values: Dict[str, Any], ttl: int):
+    """Store several JSON values with the same expiry in one round trip"""
+    if not values:
+        return
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.setex(key, ttl, json.dumps(value, default=str))
+        pipeline.execute()
+    except redis.RedisError:
+        pass
@@ -5,6 +5,9 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./social_media_automation.db"
+    DB_POOL_SIZE: int = 50
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # seconds
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -19,6 +22,9 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
     ALLOWED_EXTENSIONS: list = [".mp4", ".avi", ".mov", ".jpg", ".jpeg", ".png", ".gif"]
     
+    # Video processing: libx264, or h264_nvenc / h264_qsv / h264_vaapi on GPU hosts
+    FFMPEG_VIDEO_CODEC: str = "libx264"
+    
     # Social Media APIs
     # Instagram/Facebook
     FACEBOOK_APP_ID: Optional[str] = None
@@ -45,6 +51,11 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
     
+    # Analytics: accounts without new activity are re-synced at most this often
+    ANALYTICS_IDLE_SYNC_INTERVAL_HOURS: int = 6
+    # Sync accounts inside sync_all_analytics instead of fanning out one task per account
+    ANALYTICS_INLINE_ASYNC: bool = False
+    
     class Config:
         env_file = ".env"
 
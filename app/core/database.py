@@ -1,11 +1,29 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+# SQLite's default pools take no sizing options
+engine_options = {}
+if not settings.DATABASE_URL.startswith("sqlite"):
+    engine_options = {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_pre_ping': True,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+    }
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    insertmanyvalues_page_size=1000,
+    **engine_options
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Thread-local sessions for Celery tasks; objects stay usable after commit
+SessionScoped = scoped_session(sessionmaker(autoflush=False, bind=engine, expire_on_commit=False))
+
 Base = declarative_base()
 
 
@@ -14,4 +32,18 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@contextmanager
+def db_session():
+    """Provide a transactional scope around a unit of work"""
+    db = SessionScoped()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        SessionScoped.remove()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import logging
+import re
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+
+# Tables range-partitioned by month on PostgreSQL (see alembic revision 0003)
+PARTITIONED_TABLES = {
+    'analytics': 'date',
+    'post_analytics': 'collected_at',
+}
+
+# Months of partitions kept ready ahead of the current one
+MONTHS_AHEAD = 3
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after the given month"""
+    total = month.year * 12 + month.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Name of the monthly partition of a table, e.g. analytics_p2024_01"""
+    return f"{table}_p{month:%Y_%m}"
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    """Check whether a table has been converted to a partitioned table"""
+    
+    if db.get_bind().dialect.name != 'postgresql':
+        return False
+    
+    return db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"
+    ), {'table': table}).scalar()
+
+
+def list_partitions(db: Session, table: str) -> List[date]:
+    """Months that have a partition of the table, oldest first"""
+    
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"
+    ), {'table': table}).scalars()
+    
+    pattern = re.compile(rf"^{table}_p(\d{{4}})_(\d{{2}})$")
+    months = []
+    
+    for name in names:
+        match = pattern.match(name)
+        if match:  # Skips the DEFAULT partition
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    
+    return sorted(months)
+
+
+def expired_partitions(db: Session, table: str, cutoff: datetime) -> List[str]:
+    """Partitions whose whole month lies before the cutoff"""
+    
+    return [
+        partition_name(table, month)
+        for month in list_partitions(db, table)
+        if add_months(month, 1) <= cutoff.date()
+    ]
+
+
+def ensure_partitions(db: Session, table: str, months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """Create monthly partitions from the current month to `months_ahead` months out"""
+    
+    current = date.today().replace(day=1)
+    ensured = []
+    
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(table, month)
+        
+        try:
+            with db.begin_nested():
+                db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+                ))
+            ensured.append(name)
+        except DBAPIError as e:
+            # Rows for this month already landed in the DEFAULT partition
+            logger.warning("Could not create partition %s: %s", name, e)
+    
+    return ensured
@@ -12,8 +12,7 @@ from app.models import models
 from app.api import upload, scheduling, analytics, auth
 from app.tasks.celery_app import celery_app
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Database schema is managed by Alembic (alembic upgrade head)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON, Index
+from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text, true
 from app.core.database import Base
 
 
@@ -31,6 +32,10 @@ class SocialAccount(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Analytics sync state: set needs_sync when something changed on the account
+    needs_sync = Column(Boolean, default=True, server_default=true())
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    
     # Relationships
     user = relationship("User", back_populates="social_accounts")
     posts = relationship("Post", back_populates="social_account")
@@ -40,7 +45,7 @@ class Post(Base):
     __tablename__ = "posts"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     social_account_id = Column(Integer, ForeignKey("social_accounts.id"))
     
     # Content
@@ -57,7 +62,8 @@ class Post(Base):
     
     # Platform-specific data
     platform_post_id = Column(String, nullable=True)
-    platform_data = Column(JSON, nullable=True)
+    platform_data = Column(MutableDict.as_mutable(JSON), nullable=True)  # Tracks in-place changes
+    idempotency_key = Column(String(64), nullable=True)  # Key of the publish request that posted it
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -67,13 +73,18 @@ class Post(Base):
     owner = relationship("User", back_populates="posts")
     social_account = relationship("SocialAccount", back_populates="posts")
     analytics = relationship("PostAnalytics", back_populates="post")
+    
+    __table_args__ = (
+        Index("ix_posts_social_account_platform_post", "social_account_id", "platform_post_id"),
+        Index("ix_posts_status_scheduled_time", "status", "scheduled_time"),
+    )
 
 
 class PostAnalytics(Base):
     __tablename__ = "post_analytics"
     
     id = Column(Integer, primary_key=True, index=True)
-    post_id = Column(Integer, ForeignKey("posts.id"))
+    post_id = Column(Integer, ForeignKey("posts.id"), index=True)
     
     # Engagement metrics
     views = Column(Integer, default=0)
@@ -95,6 +106,10 @@ class PostAnalytics(Base):
     
     # Relationships
     post = relationship("Post", back_populates="analytics")
+    
+    __table_args__ = (
+        Index("ix_post_analytics_post_collected", "post_id", "collected_at"),
+    )
 
 
 class Schedule(Base):
@@ -124,6 +139,14 @@ class Schedule(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_executed = Column(DateTime(timezone=True), nullable=True)
     next_execution = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        # Due-schedule claims only ever look at active schedules
+        Index(
+            "ix_schedules_active_next_execution", "next_execution",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active")
+        ),
+    )
 
 
 class Analytics(Base):
@@ -150,4 +173,8 @@ class Analytics(Base):
     platform_metrics = Column(JSON)
     
     # Metadata
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_analytics_social_account_date", "social_account_id", "date"),
+    )
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import weakref
+import aiohttp
+
+
+# One pooled session per event loop; aiohttp sessions cannot be shared across loops
+_sessions = weakref.WeakKeyDictionary()
+_local = threading.local()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session for the running event loop"""
+
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+        )
+        _sessions[loop] = session
+
+    return session
+
+
+async def close_session():
+    """Close the shared HTTP session for the running event loop"""
+
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from synchronous code
+
+    Each thread keeps its own event loop so the pooled session above is
+    reused across calls instead of being rebuilt by every asyncio.run().
+    """
+
+    loop = getattr(_local, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+
+    return loop.run_until_complete(coro)
+
+
+def reset():
+    """Forget loops and sessions inherited from a parent process after fork"""
+
+    global _local
+    _sessions.clear()
+    _local = threading.local()
@@ -1,20 +1,111 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+from functools import lru_cache
+import asyncio
+import os
+import threading
 import requests
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 
 
+# File type by extension, as understood by all platform services
+_FILE_TYPES = {
+    '.jpg': 'image',
+    '.jpeg': 'image',
+    '.png': 'image',
+    '.gif': 'image',
+    '.mp4': 'video',
+    '.avi': 'video',
+    '.mov': 'video',
+}
+
+
+# Connections kept per platform host; matches the io worker's thread count
+HTTP_POOL_SIZE = 50
+
+# Connection pool shared by every thread's session; urllib3 pools are thread-safe
+_http_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=HTTP_POOL_SIZE)
+
+
+def _create_http_session() -> requests.Session:
+    """HTTP session on the shared connection pool that never stores cookies"""
+    
+    session = requests.Session()
+    # Services authenticate with tokens; a cookie set for one account must not reach another
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount('https://', _http_adapter)
+    session.mount('http://', _http_adapter)
+    return session
+
+
+class _ThreadLocalSession:
+    """Class attribute that gives each thread its own HTTP session"""
+    
+    def __init__(self):
+        self._local = threading.local()
+    
+    def __get__(self, instance, owner) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = _create_http_session()
+        return session
+
+
+class RateLimitError(Exception):
+    """Raised when a platform API answers 429 Too Many Requests"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limited. Retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether a failure is worth retrying: timeouts, dropped connections, 429s and 5xx
+    
+    Services wrap request errors in plain exceptions, so the chain of
+    causes is searched for the original one.
+    """
+    
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        
+        if isinstance(error, (RateLimitError, requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return True
+        
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            return status == 429 or status >= 500
+        
+        error = error.__cause__ or error.__context__
+    
+    return False
+
+
 class BaseSocialMediaService(ABC):
     """Base class for social media platform services"""
     
+    # Requests sessions aren't thread-safe, so each thread gets its own; they
+    # share one connection pool so connections and TLS sessions to the
+    # platform APIs are reused across posts instead of redone per request
+    http = _ThreadLocalSession()
+    
+    # Platform API host connected to ahead of the first request (see prewarm)
+    prewarm_url = None
+    
     def __init__(self, social_account):
         self.social_account = social_account
         self.access_token = social_account.access_token
         self.platform = social_account.platform
         
     @abstractmethod
-    def post_content(self, file_path: str, caption: str, title: str = None) -> Dict:
-        """Post content to the platform"""
+    def post_content(self, file_path: str, caption: str, title: str = None, idempotency_key: str = None) -> Dict:
+        """Post content to the platform
+        
+        Platforms that dedupe requests get idempotency_key on the publish call.
+        """
         pass
     
     @abstractmethod
@@ -27,6 +118,18 @@ class BaseSocialMediaService(ABC):
         """Get analytics for recent posts"""
         pass
     
+    def iter_posts_analytics(self, limit: int = 50) -> Iterator[Dict]:
+        """Yield analytics for recent posts one at a time"""
+        yield from self.get_posts_analytics(limit)
+    
+    async def get_account_metrics_async(self) -> Dict:
+        """Get account-level metrics without blocking the event loop"""
+        return await asyncio.to_thread(self.get_account_metrics)
+    
+    async def get_posts_analytics_async(self, limit: int = 50) -> List[Dict]:
+        """Get analytics for recent posts without blocking the event loop"""
+        return await asyncio.to_thread(self.get_posts_analytics, limit)
+    
     def validate_token(self) -> bool:
         """Validate if the access token is still valid"""
         try:
@@ -59,12 +162,12 @@ class BaseSocialMediaService(ABC):
         kwargs['headers'] = headers
         
         try:
-            response = requests.request(method, url, **kwargs)
+            response = self.http.request(method, url, **kwargs)
             
             # Handle rate limiting
             if response.status_code == 429:
                 retry_after = int(response.headers.get('Retry-After', 60))
-                raise Exception(f"Rate limited. Retry after {retry_after} seconds")
+                raise RateLimitError(retry_after)
             
             # Handle authentication errors
             if response.status_code == 401:
@@ -72,7 +175,7 @@ class BaseSocialMediaService(ABC):
                     # Retry with new token
                     headers['Authorization'] = f'Bearer {self.access_token}'
                     kwargs['headers'] = headers
-                    response = requests.request(method, url, **kwargs)
+                    response = self.http.request(method, url, **kwargs)
                 else:
                     raise Exception("Authentication failed and token refresh failed")
             
@@ -82,6 +185,23 @@ class BaseSocialMediaService(ABC):
         except requests.exceptions.RequestException as e:
             raise Exception(f"API request failed: {str(e)}")
     
+    @classmethod
+    def prewarm(cls):
+        """Open a pooled connection to the platform API before the first real request"""
+        
+        if not cls.prewarm_url:
+            return
+        
+        try:
+            cls.http.head(cls.prewarm_url, timeout=5)
+        except requests.exceptions.RequestException:
+            pass  # The first real request connects instead
+    
+    @staticmethod
+    def idempotency_headers(idempotency_key: str = None) -> Dict:
+        """Headers that let the platform drop a repeated publish request"""
+        return {'X-Request-Id': idempotency_key} if idempotency_key else {}
+    
     def upload_media(self, file_path: str) -> Dict:
         """Upload media file to platform"""
         # This should be implemented by each platform service
@@ -97,18 +217,19 @@ class BaseSocialMediaService(ABC):
         
         return formatted_caption
     
-    def get_file_type(self, file_path: str) -> str:
+    @staticmethod
+    def can_handle(file_path: str) -> bool:
+        """Cheap check, before instantiating the service, that the file can be posted"""
+        return True
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def get_file_type(file_path: str) -> str:
         """Determine file type from file path"""
-        import os
         
         extension = os.path.splitext(file_path)[1].lower()
         
-        if extension in ['.jpg', '.jpeg', '.png', '.gif']:
-            return 'image'
-        elif extension in ['.mp4', '.avi', '.mov']:
-            return 'video'
-        else:
-            return 'unknown'
+        return _FILE_TYPES.get(extension, 'unknown')
     
     def validate_file_for_platform(self, file_path: str) -> bool:
         """Validate if file is supported by the platform"""
@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Dict
+
+
+class PlatformUnavailable(Exception):
+    """Raised instead of calling a platform whose circuit is open"""
+    pass
+
+
+class CircuitBreaker:
+    """Stop calling a platform after repeated transient failures
+    
+    After `error_threshold` consecutive failures the circuit opens and calls
+    are refused for `recovery_window` seconds; then one trial call is let
+    through, which closes the circuit on success or reopens it on failure.
+    State is per worker process.
+    """
+    
+    def __init__(self, name: str, error_threshold: int = 5, recovery_window: int = 60):
+        self.name = name
+        self.error_threshold = error_threshold
+        self.recovery_window = recovery_window
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            
+            if time.monotonic() - self.opened_at >= self.recovery_window:
+                # Half-open: let this call through and hold the others off for another window
+                self.opened_at = time.monotonic()
+                return True
+            
+            return False
+    
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        """Count a transient failure, opening the circuit at the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.error_threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get the circuit breaker for a platform"""
+    
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
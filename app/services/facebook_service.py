@@ -1,5 +1,4 @@
 from typing import Dict, List
-import requests
 import os
 from datetime import datetime
 
@@ -10,12 +9,14 @@ from app.core.config import settings
 class FacebookService(BaseSocialMediaService):
     """Facebook API service for posting and analytics"""
     
+    prewarm_url = "https://graph.facebook.com"
+    
     def __init__(self, social_account):
         super().__init__(social_account)
         self.base_url = "https://graph.facebook.com/v18.0"
         self.page_id = social_account.platform_data.get('page_id') if social_account.platform_data else None
     
-    def post_content(self, file_path: str, caption: str, title: str = None) -> Dict:
+    def post_content(self, file_path: str, caption: str, title: str = None, idempotency_key: str = None) -> Dict:
         """Post content to Facebook"""
         
         try:
@@ -23,19 +24,20 @@ class FacebookService(BaseSocialMediaService):
                 raise Exception("Facebook page ID not configured")
             
             file_type = self.get_file_type(file_path)
+            headers = self.idempotency_headers(idempotency_key)
             
             if file_type == 'image':
-                return self._post_image(file_path, caption)
+                return self._post_image(file_path, caption, headers)
             elif file_type == 'video':
-                return self._post_video(file_path, caption)
+                return self._post_video(file_path, caption, headers)
             else:
                 # Post as text with link if it's not media
-                return self._post_text(caption)
+                return self._post_text(caption, headers)
                 
         except Exception as e:
             raise Exception(f"Facebook posting failed: {str(e)}")
     
-    def _post_image(self, file_path: str, caption: str) -> Dict:
+    def _post_image(self, file_path: str, caption: str, headers: Dict = None) -> Dict:
         """Post image to Facebook"""
         
         try:
@@ -48,7 +50,7 @@ class FacebookService(BaseSocialMediaService):
                     'access_token': self.access_token
                 }
                 
-                response = requests.post(url, files=files, data=data)
+                response = self.http.post(url, files=files, data=data, headers=headers)
                 response.raise_for_status()
                 
                 result = response.json()
@@ -64,7 +66,7 @@ class FacebookService(BaseSocialMediaService):
         except Exception as e:
             raise Exception(f"Facebook image posting failed: {str(e)}")
     
-    def _post_video(self, file_path: str, caption: str) -> Dict:
+    def _post_video(self, file_path: str, caption: str, headers: Dict = None) -> Dict:
         """Post video to Facebook"""
         
         try:
@@ -77,7 +79,7 @@ class FacebookService(BaseSocialMediaService):
                     'access_token': self.access_token
                 }
                 
-                response = requests.post(url, files=files, data=data)
+                response = self.http.post(url, files=files, data=data, headers=headers)
                 response.raise_for_status()
                 
                 result = response.json()
@@ -93,7 +95,7 @@ class FacebookService(BaseSocialMediaService):
         except Exception as e:
             raise Exception(f"Facebook video posting failed: {str(e)}")
     
-    def _post_text(self, message: str) -> Dict:
+    def _post_text(self, message: str, headers: Dict = None) -> Dict:
         """Post text-only content to Facebook"""
         
         try:
@@ -103,7 +105,7 @@ class FacebookService(BaseSocialMediaService):
                 'access_token': self.access_token
             }
             
-            response = requests.post(url, data=data)
+            response = self.http.post(url, data=data, headers=headers)
             response.raise_for_status()
             
             result = response.json()
@@ -281,7 +283,7 @@ class FacebookService(BaseSocialMediaService):
                 'fb_exchange_token': self.access_token
             }
             
-            response = requests.get(refresh_url, params=refresh_params)
+            response = self.http.get(refresh_url, params=refresh_params)
             response.raise_for_status()
             
             token_data = response.json()
@@ -359,7 +361,7 @@ class FacebookService(BaseSocialMediaService):
                     url = f"{self.base_url}/{self.page_id}/photos"
                     with open(media_path, 'rb') as media_file:
                         files = {'source': media_file}
-                        response = requests.post(url, files=files, data=data)
+                        response = self.http.post(url, files=files, data=data)
                         
                 elif file_type == 'video':
                     # For videos, use videos endpoint
@@ -367,13 +369,13 @@ class FacebookService(BaseSocialMediaService):
                     data['description'] = data.pop('message')  # Videos use description instead of message
                     with open(media_path, 'rb') as media_file:
                         files = {'source': media_file}
-                        response = requests.post(url, files=files, data=data)
+                        response = self.http.post(url, files=files, data=data)
                 else:
                     # Text only
-                    response = requests.post(url, data=data)
+                    response = self.http.post(url, data=data)
             else:
                 # Text only
-                response = requests.post(url, data=data)
+                response = self.http.post(url, data=data)
             
             response.raise_for_status()
             result = response.json()
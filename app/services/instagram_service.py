@@ -1,5 +1,4 @@
 from typing import Dict, List
-import requests
 import os
 from datetime import datetime
 
@@ -10,12 +9,14 @@ from app.core.config import settings
 class InstagramService(BaseSocialMediaService):
     """Instagram API service for posting and analytics"""
     
+    prewarm_url = "https://graph.facebook.com"
+    
     def __init__(self, social_account):
         super().__init__(social_account)
         self.base_url = "https://graph.facebook.com/v18.0"
         self.instagram_account_id = social_account.platform_data.get('instagram_account_id') if social_account.platform_data else None
     
-    def post_content(self, file_path: str, caption: str, title: str = None) -> Dict:
+    def post_content(self, file_path: str, caption: str, title: str = None, idempotency_key: str = None) -> Dict:
         """Post content to Instagram"""
         
         try:
@@ -24,17 +25,19 @@ class InstagramService(BaseSocialMediaService):
             
             file_type = self.get_file_type(file_path)
             
+            headers = self.idempotency_headers(idempotency_key)
+            
             if file_type == 'image':
-                return self._post_image(file_path, caption)
+                return self._post_image(file_path, caption, headers)
             elif file_type == 'video':
-                return self._post_video(file_path, caption)
+                return self._post_video(file_path, caption, headers)
             else:
                 raise Exception(f"Unsupported file type: {file_type}")
                 
         except Exception as e:
             raise Exception(f"Instagram posting failed: {str(e)}")
     
-    def _post_image(self, file_path: str, caption: str) -> Dict:
+    def _post_image(self, file_path: str, caption: str, headers: Dict = None) -> Dict:
         """Post image to Instagram"""
         
         # Step 1: Upload image and get media ID
@@ -47,7 +50,7 @@ class InstagramService(BaseSocialMediaService):
                 'access_token': self.access_token
             }
             
-            response = requests.post(upload_url, files=files, data=data)
+            response = self.http.post(upload_url, files=files, data=data)
             response.raise_for_status()
             
             media_data = response.json()
@@ -60,7 +63,7 @@ class InstagramService(BaseSocialMediaService):
             'access_token': self.access_token
         }
         
-        publish_response = requests.post(publish_url, data=publish_data)
+        publish_response = self.http.post(publish_url, data=publish_data, headers=headers)
         publish_response.raise_for_status()
         
         result = publish_response.json()
@@ -73,7 +76,7 @@ class InstagramService(BaseSocialMediaService):
             'published_at': datetime.now().isoformat()
         }
     
-    def _post_video(self, file_path: str, caption: str) -> Dict:
+    def _post_video(self, file_path: str, caption: str, headers: Dict = None) -> Dict:
         """Post video to Instagram"""
         
         # Step 1: Upload video and get media ID
@@ -87,7 +90,7 @@ class InstagramService(BaseSocialMediaService):
                 'access_token': self.access_token
             }
             
-            response = requests.post(upload_url, files=files, data=data)
+            response = self.http.post(upload_url, files=files, data=data)
             response.raise_for_status()
             
             media_data = response.json()
@@ -101,7 +104,7 @@ class InstagramService(BaseSocialMediaService):
         import time
         max_attempts = 30
         for _ in range(max_attempts):
-            status_response = requests.get(status_url, params=status_params)
+            status_response = self.http.get(status_url, params=status_params)
             status_data = status_response.json()
             
             if status_data.get('status_code') == 'FINISHED':
@@ -118,7 +121,7 @@ class InstagramService(BaseSocialMediaService):
             'access_token': self.access_token
         }
         
-        publish_response = requests.post(publish_url, data=publish_data)
+        publish_response = self.http.post(publish_url, data=publish_data, headers=headers)
         publish_response.raise_for_status()
         
         result = publish_response.json()
@@ -249,7 +252,7 @@ class InstagramService(BaseSocialMediaService):
                 'fb_exchange_token': self.access_token
             }
             
-            response = requests.post(refresh_url, data=refresh_data)
+            response = self.http.post(refresh_url, data=refresh_data)
             response.raise_for_status()
             
             token_data = response.json()
@@ -1,5 +1,4 @@
 from typing import Dict, List
-import requests
 import os
 from datetime import datetime
 
@@ -10,12 +9,14 @@ from app.core.config import settings
 class TikTokService(BaseSocialMediaService):
     """TikTok API service for posting and analytics"""
     
+    prewarm_url = "https://open-api.tiktok.com"
+    
     def __init__(self, social_account):
         super().__init__(social_account)
         self.base_url = "https://open-api.tiktok.com"
         self.client_key = settings.TIKTOK_CLIENT_KEY
     
-    def post_content(self, file_path: str, caption: str, title: str = None) -> Dict:
+    def post_content(self, file_path: str, caption: str, title: str = None, idempotency_key: str = None) -> Dict:
         """Upload video to TikTok"""
         
         try:
@@ -58,7 +59,7 @@ class TikTokService(BaseSocialMediaService):
                 'Content-Type': 'application/json; charset=UTF-8'
             }
             
-            init_response = requests.post(init_url, json=init_data, headers=headers)
+            init_response = self.http.post(init_url, json=init_data, headers=headers)
             init_response.raise_for_status()
             
             init_result = init_response.json()
@@ -71,7 +72,7 @@ class TikTokService(BaseSocialMediaService):
             
             # Step 2: Upload video file
             with open(file_path, 'rb') as video_file:
-                upload_response = requests.put(
+                upload_response = self.http.put(
                     upload_url,
                     data=video_file,
                     headers={'Content-Type': 'video/mp4'}
@@ -84,7 +85,7 @@ class TikTokService(BaseSocialMediaService):
                 'publish_id': publish_id
             }
             
-            commit_response = requests.post(commit_url, json=commit_data, headers=headers)
+            commit_response = self.http.post(commit_url, json=commit_data, headers=headers)
             commit_response.raise_for_status()
             
             commit_result = commit_response.json()
@@ -208,7 +209,7 @@ class TikTokService(BaseSocialMediaService):
                 'refresh_token': self.social_account.refresh_token
             }
             
-            response = requests.post(refresh_url, json=refresh_data)
+            response = self.http.post(refresh_url, json=refresh_data)
             response.raise_for_status()
             
             token_data = response.json()
@@ -32,7 +32,7 @@ class TwitterService(BaseSocialMediaService):
         )
         self.api_v1 = tweepy.API(auth, wait_on_rate_limit=True)
     
-    def post_content(self, file_path: str, caption: str, title: str = None) -> Dict:
+    def post_content(self, file_path: str, caption: str, title: str = None, idempotency_key: str = None) -> Dict:
         """Post content to Twitter"""
         
         try:
@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional
+import asyncio
+import orjson
+
+from app.services.async_http import get_session, run_sync
+from app.services.youtube_service import (
+    _PART_CONTENT_DETAILS,
+    _PART_STATS_SNIPPET,
+    format_channel_metrics,
+    format_posts_analytics,
+    format_video_analytics,
+)
+
+
+API_BASE_URL = "https://youtube.googleapis.com/youtube/v3"
+
+
+async def api_get(access_token: str, endpoint: str, params: Dict) -> Dict:
+    """Make an authenticated GET request to the YouTube Data API"""
+
+    async with get_session().get(
+        f"{API_BASE_URL}/{endpoint}",
+        params=params,
+        headers={'Authorization': f'Bearer {access_token}'}
+    ) as response:
+        response.raise_for_status()
+        return orjson.loads(await response.read())
+
+
+async def aget_account_metrics(access_token: str) -> Dict:
+    """Get YouTube channel metrics"""
+
+    try:
+        channels_response = await api_get(access_token, 'channels', {
+            'part': _PART_STATS_SNIPPET,
+            'mine': 'true'
+        })
+
+        if not channels_response.get('items'):
+            raise Exception("No YouTube channel found")
+
+        return format_channel_metrics(channels_response['items'][0])
+
+    except Exception as e:
+        raise Exception(f"Failed to get YouTube account metrics: {str(e)}")
+
+
+async def aget_uploads_playlist_id(access_token: str) -> str:
+    """Get the id of the channel's uploads playlist"""
+
+    channels_response = await api_get(access_token, 'channels', {
+        'part': _PART_CONTENT_DETAILS,
+        'mine': 'true'
+    })
+
+    if not channels_response.get('items'):
+        raise Exception("No YouTube channel found")
+
+    return channels_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+
+async def aget_posts_analytics(access_token: str, limit: int = 50) -> List[Dict]:
+    """Get analytics for recent YouTube videos
+
+    Recent uploads are read from the uploads playlist (1 quota unit per
+    call) instead of search.list (100 units).
+    """
+
+    try:
+        items_response = await api_get(access_token, 'playlistItems', {
+            'part': _PART_CONTENT_DETAILS,
+            'playlistId': await aget_uploads_playlist_id(access_token),
+            'maxResults': min(limit, 50)  # API limit
+        })
+
+        video_ids = [item['contentDetails']['videoId'] for item in items_response.get('items', [])]
+
+        if not video_ids:
+            return []
+
+        stats_response = await api_get(access_token, 'videos', {
+            'part': _PART_STATS_SNIPPET,
+            'id': ','.join(video_ids)
+        })
+
+        return format_posts_analytics(stats_response.get('items', []))
+
+    except Exception as e:
+        raise Exception(f"Failed to get YouTube posts analytics: {str(e)}")
+
+
+async def aget_video_analytics(access_token: str, video_id: str) -> Dict:
+    """Get detailed analytics for a specific video"""
+
+    try:
+        video_response = await api_get(access_token, 'videos', {
+            'part': _PART_STATS_SNIPPET,
+            'id': video_id
+        })
+
+        if not video_response.get('items'):
+            raise Exception("Video not found")
+
+        return format_video_analytics(video_response['items'][0])
+
+    except Exception as e:
+        raise Exception(f"Failed to get YouTube video analytics: {str(e)}")
+
+
+async def aget_dashboard(access_token: str, limit: int = 50, video_ids: Optional[List[str]] = None) -> Dict:
+    """Fetch account metrics, post analytics and video details concurrently
+
+    Async callers (e.g. FastAPI endpoints) await this directly; the sync
+    wrappers below are for worker code only.
+    """
+
+    video_ids = video_ids or []
+
+    account_metrics, posts_analytics, *videos = await asyncio.gather(
+        aget_account_metrics(access_token),
+        aget_posts_analytics(access_token, limit),
+        *(aget_video_analytics(access_token, video_id) for video_id in video_ids)
+    )
+
+    return {
+        'account_metrics': account_metrics,
+        'posts_analytics': posts_analytics,
+        'videos': videos
+    }
+
+
+def get_account_metrics(access_token: str) -> Dict:
+    """Synchronous wrapper for aget_account_metrics"""
+    return run_sync(aget_account_metrics(access_token))
+
+
+def get_posts_analytics(access_token: str, limit: int = 50) -> List[Dict]:
+    """Synchronous wrapper for aget_posts_analytics"""
+    return run_sync(aget_posts_analytics(access_token, limit))
+
+
+def get_video_analytics(access_token: str, video_id: str) -> Dict:
+    """Synchronous wrapper for aget_video_analytics"""
+    return run_sync(aget_video_analytics(access_token, video_id))
+
+
+def get_dashboard(access_token: str, limit: int = 50, video_ids: Optional[List[str]] = None) -> Dict:
+    """Synchronous wrapper for aget_dashboard"""
+    return run_sync(aget_dashboard(access_token, limit, video_ids))
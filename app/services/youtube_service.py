@@ -1,31 +1,157 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List
+import asyncio
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
+from googleapiclient.model import JsonModel
 from google.oauth2.credentials import Credentials
+import orjson
 
 from app.services.base_service import BaseSocialMediaService
+from app.core import cache
 from app.core.config import settings
 
 
+# Refresh access tokens this long before they actually expire
+_TOKEN_REFRESH_MARGIN = timedelta(minutes=2)
+
+# Lifetime assumed for a refreshed token when Google doesn't report one
+_DEFAULT_TOKEN_LIFETIME = timedelta(hours=1)
+
+# Video containers accepted by YouTube uploads
+_SUPPORTED_FORMATS = frozenset(['.mp4', '.mov', '.avi', '.wmv', '.flv', '.webm', '.mkv'])
+
+# Redis lifetimes for the analytics polling path
+_UPLOADS_PLAYLIST_TTL = 24 * 60 * 60
+_VIDEO_ANALYTICS_TTL = 60 * 60
+
+# API "part" selectors
+_PART_SNIPPET = 'snippet'
+_PART_CONTENT_DETAILS = 'contentDetails'
+_PART_SNIPPET_STATUS = 'snippet,status'
+_PART_STATS_SNIPPET = 'statistics,snippet'
+_PART_ID_SNIPPET = 'id,snippet'
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that decodes API responses with orjson instead of json"""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return content.decode('utf-8') if isinstance(content, bytes) else content
+        
+        if self._data_wrapper and 'data' in body:
+            body = body['data']
+        
+        return body
+
+
+def format_channel_metrics(channel: Dict) -> Dict:
+    """Format a channels.list item into account metrics"""
+    
+    stats = channel['statistics']
+    
+    return {
+        'followers_count': int(stats.get('subscriberCount', 0)),
+        'following_count': 0,  # YouTube doesn't have following concept
+        'posts_count': int(stats.get('videoCount', 0)),
+        'total_views': int(stats.get('viewCount', 0)),
+        'followers_growth': 0,  # Calculate from historical data
+        'engagement_growth': 0.0,  # Calculate from historical data
+        'channel_title': channel['snippet'].get('title', ''),
+        'channel_description': channel['snippet'].get('description', '')
+    }
+
+
+def format_posts_analytics(videos: List[Dict]) -> List[Dict]:
+    """Format videos.list items into post analytics"""
+    
+    # Bind hot lookups to locals; this loop runs once per video on every sync
+    _int = int
+    results = [None] * len(videos)
+    
+    for i, video in enumerate(videos):
+        stats = video['statistics']
+        snippet = video['snippet']
+        get_stat = stats.get
+        get_snippet = snippet.get
+        
+        # Calculate engagement rate
+        views = _int(get_stat('viewCount', 0))
+        likes = _int(get_stat('likeCount', 0))
+        comments = _int(get_stat('commentCount', 0))
+        
+        engagement_rate = (likes + comments) * 100.0 / views if views else 0
+        
+        results[i] = {
+            'post_id': video['id'],
+            'title': get_snippet('title', ''),
+            'views': views,
+            'likes': likes,
+            'comments': comments,
+            'shares': 0,  # YouTube doesn't provide share count via API
+            'saves': 0,   # Not available
+            'reach': views,  # Use views as reach approximation
+            'impressions': views,
+            'engagement_rate': engagement_rate,
+            'published_at': get_snippet('publishedAt'),
+            'duration': get_snippet('duration', ''),
+            'thumbnail_url': get_snippet('thumbnails', {}).get('medium', {}).get('url', '')
+        }
+    
+    return results
+
+
+def format_video_analytics(video: Dict) -> Dict:
+    """Format a videos.list item into detailed video analytics"""
+    
+    stats = video['statistics']
+    snippet = video['snippet']
+    
+    return {
+        'video_id': video['id'],
+        'title': snippet.get('title', ''),
+        'views': int(stats.get('viewCount', 0)),
+        'likes': int(stats.get('likeCount', 0)),
+        'comments': int(stats.get('commentCount', 0)),
+        'published_at': snippet.get('publishedAt'),
+        'duration': snippet.get('duration', ''),
+        'tags': snippet.get('tags', []),
+        'category_id': snippet.get('categoryId', ''),
+        'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', '')
+    }
+
+
 class YouTubeService(BaseSocialMediaService):
     """YouTube API service for posting and analytics"""
     
     def __init__(self, social_account):
         super().__init__(social_account)
+    
+    @cached_property
+    def youtube(self):
+        """YouTube API client, built on first use"""
         
-        # Initialize YouTube API client
         credentials = Credentials(
-            token=social_account.access_token,
-            refresh_token=social_account.refresh_token,
+            token=self.access_token,
+            refresh_token=self.social_account.refresh_token,
             client_id=settings.YOUTUBE_CLIENT_ID,
             client_secret=settings.YOUTUBE_CLIENT_SECRET
         )
         
-        self.youtube = build('youtube', 'v3', credentials=credentials)
+        return build(
+            'youtube', 'v3',
+            credentials=credentials,
+            model=_OrjsonModel(),
+            static_discovery=True,
+            cache_discovery=False
+        )
     
-    def post_content(self, file_path: str, caption: str, title: str = None) -> Dict:
+    def post_content(self, file_path: str, caption: str, title: str = None, idempotency_key: str = None) -> Dict:
         """Upload video to YouTube"""
         
         try:
@@ -34,6 +160,8 @@ class YouTubeService(BaseSocialMediaService):
             if file_type != 'video':
                 raise Exception("YouTube only supports video uploads")
             
+            self._ensure_valid_token()
+            
             return self._upload_video(file_path, title or "Untitled Video", caption)
                 
         except Exception as e:
@@ -48,7 +176,6 @@ class YouTubeService(BaseSocialMediaService):
                 'snippet': {
                     'title': title,
                     'description': description,
-                    'tags': [],  # Can be extracted from description or passed separately
                     'categoryId': '22'  # People & Blogs category
                 },
                 'status': {
@@ -67,7 +194,7 @@ class YouTubeService(BaseSocialMediaService):
             
             # Execute upload
             insert_request = self.youtube.videos().insert(
-                part=','.join(body.keys()),
+                part=_PART_SNIPPET_STATUS,
                 body=body,
                 media_body=media
             )
@@ -79,7 +206,7 @@ class YouTubeService(BaseSocialMediaService):
                 'platform': 'youtube',
                 'media_type': 'video',
                 'status': 'published',
-                'published_at': datetime.now().isoformat(),
+                'published_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
                 'video_url': f"https://www.youtube.com/watch?v={response['id']}",
                 'title': title,
                 'description': description
@@ -92,91 +219,150 @@ class YouTubeService(BaseSocialMediaService):
         """Get YouTube channel metrics"""
         
         try:
+            self._ensure_valid_token()
+            
             # Get channel statistics
             channels_response = self.youtube.channels().list(
-                part='statistics,snippet',
+                part=_PART_STATS_SNIPPET,
                 mine=True
             ).execute()
             
             if not channels_response['items']:
                 raise Exception("No YouTube channel found")
             
-            channel = channels_response['items'][0]
-            stats = channel['statistics']
-            
-            return {
-                'followers_count': int(stats.get('subscriberCount', 0)),
-                'following_count': 0,  # YouTube doesn't have following concept
-                'posts_count': int(stats.get('videoCount', 0)),
-                'total_views': int(stats.get('viewCount', 0)),
-                'followers_growth': 0,  # Calculate from historical data
-                'engagement_growth': 0.0,  # Calculate from historical data
-                'channel_title': channel['snippet'].get('title', ''),
-                'channel_description': channel['snippet'].get('description', '')
-            }
+            return format_channel_metrics(channels_response['items'][0])
             
         except Exception as e:
             raise Exception(f"Failed to get YouTube account metrics: {str(e)}")
     
+    async def get_account_metrics_async(self) -> Dict:
+        """Get YouTube channel metrics over the pooled aiohttp session
+        
+        The googleapiclient transport is not thread-safe, so this avoids
+        sharing it with a concurrent get_posts_analytics_async thread.
+        """
+        
+        from app.services import youtube_async
+        
+        await asyncio.to_thread(self._ensure_valid_token)
+        
+        return await youtube_async.aget_account_metrics(self.access_token)
+    
     def get_posts_analytics(self, limit: int = 50) -> List[Dict]:
         """Get analytics for recent YouTube videos"""
         
+        return list(self.iter_posts_analytics(limit))
+    
+    def iter_posts_analytics(self, limit: int = 50) -> Iterator[Dict]:
+        """Yield analytics for recent YouTube videos one at a time
+        
+        Recent uploads are read from the channel's uploads playlist (1 quota
+        unit) instead of search.list (100 units), and statistics are only
+        fetched for videos whose cached analytics have expired.
+        """
+        
         try:
-            # Get recent videos
-            videos_response = self.youtube.search().list(
-                part='id,snippet',
-                forMine=True,
-                type='video',
-                order='date',
+            self._ensure_valid_token()
+            
+            # Get recent videos, newest first
+            items_response = self.youtube.playlistItems().list(
+                part=_PART_CONTENT_DETAILS,
+                playlistId=self._get_uploads_playlist_id(),
                 maxResults=min(limit, 50)  # API limit
             ).execute()
             
-            video_ids = [item['id']['videoId'] for item in videos_response['items']]
+            video_ids = [item['contentDetails']['videoId'] for item in items_response['items']]
             
             if not video_ids:
-                return []
+                return
             
-            # Get video statistics
-            stats_response = self.youtube.videos().list(
-                part='statistics,snippet',
-                id=','.join(video_ids)
-            ).execute()
+            cached = cache.get_json_many([f"youtube:video:{video_id}" for video_id in video_ids])
+            analytics_by_id = {
+                video_id: analytics
+                for video_id, analytics in zip(video_ids, cached)
+                if analytics is not None
+            }
             
-            posts_analytics = []
+            # Get statistics for new or stale videos only
+            missing_ids = [video_id for video_id in video_ids if video_id not in analytics_by_id]
             
-            for video in stats_response['items']:
-                stats = video['statistics']
-                snippet = video['snippet']
-                
-                # Calculate engagement rate
-                views = int(stats.get('viewCount', 0))
-                likes = int(stats.get('likeCount', 0))
-                comments = int(stats.get('commentCount', 0))
+            if missing_ids:
+                stats_response = self.youtube.videos().list(
+                    part=_PART_STATS_SNIPPET,
+                    id=','.join(missing_ids)
+                ).execute()
                 
-                engagement_rate = ((likes + comments) / views * 100) if views > 0 else 0
-                
-                analytics = {
-                    'post_id': video['id'],
-                    'title': snippet.get('title', ''),
-                    'views': views,
-                    'likes': likes,
-                    'comments': comments,
-                    'shares': 0,  # YouTube doesn't provide share count via API
-                    'saves': 0,   # Not available
-                    'reach': views,  # Use views as reach approximation
-                    'impressions': views,
-                    'engagement_rate': engagement_rate,
-                    'published_at': snippet.get('publishedAt'),
-                    'duration': snippet.get('duration', ''),
-                    'thumbnail_url': snippet.get('thumbnails', {}).get('medium', {}).get('url', '')
+                fetched = {
+                    analytics['post_id']: analytics
+                    for analytics in format_posts_analytics(stats_response['items'])
                 }
                 
-                posts_analytics.append(analytics)
-            
-            return posts_analytics
+                cache.set_json_many(
+                    {f"youtube:video:{video_id}": analytics for video_id, analytics in fetched.items()},
+                    _VIDEO_ANALYTICS_TTL
+                )
+                analytics_by_id.update(fetched)
             
         except Exception as e:
             raise Exception(f"Failed to get YouTube posts analytics: {str(e)}")
+        
+        for video_id in video_ids:
+            if video_id in analytics_by_id:
+                yield analytics_by_id[video_id]
+    
+    def _get_uploads_playlist_id(self) -> str:
+        """Get the id of the channel's uploads playlist, cached in Redis"""
+        
+        cache_key = f"youtube:uploads:{self.social_account.id}"
+        playlist_id = cache.get_json(cache_key)
+        
+        if playlist_id:
+            return playlist_id
+        
+        channels_response = self.youtube.channels().list(
+            part=_PART_CONTENT_DETAILS,
+            mine=True
+        ).execute()
+        
+        if not channels_response['items']:
+            raise Exception("No YouTube channel found")
+        
+        playlist_id = channels_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        cache.set_json(cache_key, playlist_id, _UPLOADS_PLAYLIST_TTL)
+        
+        return playlist_id
+    
+    def _ensure_valid_token(self) -> bool:
+        """Refresh the access token only when it is unknown or about to expire
+        
+        Raises if a needed refresh fails, rather than letting the API call
+        go ahead with a stale token.
+        """
+        
+        expires_at = self.social_account.token_expires_at
+        
+        if expires_at:
+            # Google credentials report expiry as naive UTC
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            
+            if expires_at - datetime.now(timezone.utc) > _TOKEN_REFRESH_MARGIN:
+                return True
+        elif not self.social_account.refresh_token:
+            # Nothing to refresh with, so use the stored token as it is
+            return True
+        
+        if not self._refresh_token():
+            raise Exception("YouTube access token expired and could not be refreshed")
+        
+        return True
+    
+    def refresh_token_if_needed(self) -> bool:
+        """Refresh token if it's expired or about to expire"""
+        try:
+            return self._ensure_valid_token()
+        except Exception:
+            return False
     
     def _refresh_token(self) -> bool:
         """Refresh YouTube access token"""
@@ -195,15 +381,30 @@ class YouTubeService(BaseSocialMediaService):
             
             # Update social account with new token
             self.social_account.access_token = credentials.token
-            self.social_account.token_expires_at = credentials.expiry
+            # Store an expiry even when Google omits one, so later calls skip the refresh
+            self.social_account.token_expires_at = (
+                credentials.expiry or datetime.utcnow() + _DEFAULT_TOKEN_LIFETIME
+            )
             self.access_token = credentials.token
             
+            # Rebuild the API client with the refreshed credentials on next use
+            self.__dict__.pop('youtube', None)
+            
             return True
             
         except Exception as e:
             print(f"YouTube token refresh failed: {e}")
             return False
     
+    @staticmethod
+    def can_handle(file_path: str) -> bool:
+        """Check that the file is a supported video without touching credentials"""
+        
+        return (
+            YouTubeService.get_file_type(file_path) == 'video'
+            and os.path.splitext(file_path)[1].lower() in _SUPPORTED_FORMATS
+        )
+    
     def validate_file_for_platform(self, file_path: str) -> bool:
         """Validate file for YouTube upload"""
         
@@ -219,15 +420,13 @@ class YouTubeService(BaseSocialMediaService):
         # For unverified accounts, limit is 15 minutes or 2GB
         basic_max_size = 2 * 1024 * 1024 * 1024  # 2GB
         
-        supported_formats = ['.mp4', '.mov', '.avi', '.wmv', '.flv', '.webm', '.mkv']
-        
         # Check file size (use basic limit for safety)
         if file_size > basic_max_size:
             return False
         
         # Check file format
         file_extension = os.path.splitext(file_path)[1].lower()
-        if file_extension not in supported_formats:
+        if file_extension not in _SUPPORTED_FORMATS:
             return False
         
         return True
@@ -242,6 +441,8 @@ class YouTubeService(BaseSocialMediaService):
         """Create a YouTube playlist"""
         
         try:
+            self._ensure_valid_token()
+            
             body = {
                 'snippet': {
                     'title': title,
@@ -253,7 +454,7 @@ class YouTubeService(BaseSocialMediaService):
             }
             
             response = self.youtube.playlists().insert(
-                part='snippet,status',
+                part=_PART_SNIPPET_STATUS,
                 body=body
             ).execute()
             
@@ -262,7 +463,7 @@ class YouTubeService(BaseSocialMediaService):
                 'title': title,
                 'description': description,
                 'privacy': privacy,
-                'created_at': datetime.now().isoformat()
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
             }
             
         except Exception as e:
@@ -272,6 +473,8 @@ class YouTubeService(BaseSocialMediaService):
         """Add video to YouTube playlist"""
         
         try:
+            self._ensure_valid_token()
+            
             body = {
                 'snippet': {
                     'playlistId': playlist_id,
@@ -283,7 +486,7 @@ class YouTubeService(BaseSocialMediaService):
             }
             
             response = self.youtube.playlistItems().insert(
-                part='snippet',
+                part=_PART_SNIPPET,
                 body=body
             ).execute()
             
@@ -291,7 +494,7 @@ class YouTubeService(BaseSocialMediaService):
                 'playlist_item_id': response['id'],
                 'playlist_id': playlist_id,
                 'video_id': video_id,
-                'added_at': datetime.now().isoformat()
+                'added_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
             }
             
         except Exception as e:
@@ -301,12 +504,13 @@ class YouTubeService(BaseSocialMediaService):
         """Schedule a video for later publishing"""
         
         try:
+            self._ensure_valid_token()
+            
             # Upload as private first
             body = {
                 'snippet': {
                     'title': title,
                     'description': description,
-                    'tags': [],
                     'categoryId': '22'
                 },
                 'status': {
@@ -323,7 +527,7 @@ class YouTubeService(BaseSocialMediaService):
             )
             
             insert_request = self.youtube.videos().insert(
-                part=','.join(body.keys()),
+                part=_PART_SNIPPET_STATUS,
                 body=body,
                 media_body=media
             )
@@ -347,31 +551,18 @@ class YouTubeService(BaseSocialMediaService):
         """Get detailed analytics for a specific video"""
         
         try:
+            self._ensure_valid_token()
+            
             # Get video statistics
             video_response = self.youtube.videos().list(
-                part='statistics,snippet',
+                part=_PART_STATS_SNIPPET,
                 id=video_id
             ).execute()
             
             if not video_response['items']:
                 raise Exception("Video not found")
             
-            video = video_response['items'][0]
-            stats = video['statistics']
-            snippet = video['snippet']
-            
-            return {
-                'video_id': video_id,
-                'title': snippet.get('title', ''),
-                'views': int(stats.get('viewCount', 0)),
-                'likes': int(stats.get('likeCount', 0)),
-                'comments': int(stats.get('commentCount', 0)),
-                'published_at': snippet.get('publishedAt'),
-                'duration': snippet.get('duration', ''),
-                'tags': snippet.get('tags', []),
-                'category_id': snippet.get('categoryId', ''),
-                'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', '')
-            }
+            return format_video_analytics(video_response['items'][0])
             
         except Exception as e:
             raise Exception(f"Failed to get YouTube video analytics: {str(e)}")
@@ -380,9 +571,11 @@ class YouTubeService(BaseSocialMediaService):
         """Search for videos on YouTube"""
         
         try:
+            self._ensure_valid_token()
+            
             search_response = self.youtube.search().list(
                 q=query,
-                part='id,snippet',
+                part=_PART_ID_SNIPPET,
                 type='video',
                 maxResults=min(limit, 50)
             ).execute()
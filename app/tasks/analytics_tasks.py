@@ -1,11 +1,22 @@
-from celery import current_task
+from celery import group
+import asyncio
+from collections import defaultdict
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from typing import Dict, List
+from itertools import groupby
+import logging
+import time
+from sqlalchemy import delete, func, insert, or_, select, text, update
+from sqlalchemy.orm import Session, load_only, raiseload
+from typing import List
+from redis.exceptions import LockError
 
 from app.tasks.celery_app import celery_app
+from app.core import cache, partitions
+from app.core.config import settings
+from app.core.cache import redis_client
 from app.core.database import SessionLocal
 from app.models.models import Analytics, PostAnalytics, Post, SocialAccount
+from app.services.async_http import run_sync
 from app.services.instagram_service import InstagramService
 from app.services.facebook_service import FacebookService
 from app.services.twitter_service import TwitterService
@@ -13,19 +24,52 @@ from app.services.youtube_service import YouTubeService
 from app.services.tiktok_service import TikTokService
 
 
+logger = logging.getLogger(__name__)
+
+
+# Upper bound on a single account sync; the dedupe lock expires after this
+SYNC_LOCK_TIMEOUT = 30 * 60
+
+# Window for which fetched account metrics are reused across syncs
+ACCOUNT_METRICS_TTL = 15 * 60
+
+# How long the "user's other posts" totals are reused by analyze_post_performance
+USER_TOTALS_TTL = 10 * 60
+
+# Accounts synced at once when ANALYTICS_INLINE_ASYNC is on; each holds a DB connection
+INLINE_SYNC_CONCURRENCY = 10
+
+
 @celery_app.task(bind=True)
 def sync_platform_analytics(self, social_account_id: int):
     """Sync analytics for a specific social media account"""
+    return sync_account_analytics(social_account_id, self.update_state)
+
+
+def sync_account_analytics(social_account_id: int, update_state=None):
+    """Sync analytics for one account, reporting progress through update_state if given"""
+    
+    update_state = update_state or (lambda **kwargs: None)
+    
+    # Skip if a previous run for this account is still in flight
+    sync_lock = redis_client.lock(f"sync:{social_account_id}", timeout=SYNC_LOCK_TIMEOUT, blocking=False)
+    
+    if not sync_lock.acquire():
+        return {
+            'social_account_id': social_account_id,
+            'status': 'skipped',
+            'reason': 'Sync already in progress'
+        }
     
     try:
         db = SessionLocal()
-        social_account = db.query(SocialAccount).filter(SocialAccount.id == social_account_id).first()
+        social_account = db.get(SocialAccount, social_account_id)
         
         if not social_account:
             raise Exception("Social account not found")
         
         # Update task progress
-        self.update_state(state='PROGRESS', meta={'progress': 10, 'status': f'Syncing {social_account.platform} analytics...'})
+        update_state(state='PROGRESS', meta={'progress': 10, 'status': f'Syncing {social_account.platform} analytics...'})
         
         # Get appropriate service
         service = get_analytics_service(social_account.platform, social_account)
@@ -33,13 +77,18 @@ def sync_platform_analytics(self, social_account_id: int):
         if not service:
             raise Exception(f"Analytics service not available for {social_account.platform}")
         
-        # Fetch account metrics
-        self.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Fetching account metrics...'})
-        account_metrics = service.get_account_metrics()
+        # Account metrics move slowly; reuse a fetch from the current window if there is one
+        metrics_key = f"acct:{social_account_id}:{int(time.time() // ACCOUNT_METRICS_TTL)}"
+        account_metrics = cache.get_json(metrics_key)
         
-        # Fetch post analytics
-        self.update_state(state='PROGRESS', meta={'progress': 60, 'status': 'Fetching post analytics...'})
-        post_analytics = service.get_posts_analytics()
+        if account_metrics is None:
+            # Fetch account metrics and post analytics concurrently
+            update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Fetching account metrics and post analytics...'})
+            account_metrics, post_analytics = run_sync(fetch_platform_analytics(service))
+            cache.set_json(metrics_key, account_metrics, ACCOUNT_METRICS_TTL)
+        else:
+            update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Fetching post analytics...'})
+            post_analytics = service.get_posts_analytics()
         
         # Save account analytics
         analytics = Analytics(
@@ -57,43 +106,59 @@ def sync_platform_analytics(self, social_account_id: int):
         
         db.add(analytics)
         
-        # Save post analytics
-        for post_data in post_analytics:
-            post = db.query(Post).filter(
-                Post.platform_post_id == post_data.get('post_id'),
-                Post.social_account_id == social_account_id
-            ).first()
-            
-            if post:
-                post_analytics_record = PostAnalytics(
-                    post_id=post.id,
-                    views=post_data.get('views', 0),
-                    likes=post_data.get('likes', 0),
-                    comments=post_data.get('comments', 0),
-                    shares=post_data.get('shares', 0),
-                    saves=post_data.get('saves', 0),
-                    reach=post_data.get('reach', 0),
-                    impressions=post_data.get('impressions', 0),
-                    engagement_rate=post_data.get('engagement_rate', 0.0),
-                    click_through_rate=post_data.get('click_through_rate', 0.0)
+        # Save post analytics: resolve all posts in one query, insert in one batch
+        platform_post_ids = [post_data.get('post_id') for post_data in post_analytics if post_data.get('post_id')]
+        post_id_map = {}
+        
+        if platform_post_ids:
+            post_id_map = dict(db.execute(
+                select(Post.platform_post_id, Post.id).where(
+                    Post.social_account_id == social_account_id,
+                    Post.platform_post_id.in_(platform_post_ids)
                 )
-                
-                db.add(post_analytics_record)
+            ).all())
+        
+        post_analytics_records = [
+            {
+                'post_id': post_id_map[post_data.get('post_id')],
+                'views': post_data.get('views', 0),
+                'likes': post_data.get('likes', 0),
+                'comments': post_data.get('comments', 0),
+                'shares': post_data.get('shares', 0),
+                'saves': post_data.get('saves', 0),
+                'reach': post_data.get('reach', 0),
+                'impressions': post_data.get('impressions', 0),
+                'engagement_rate': post_data.get('engagement_rate', 0.0),
+                'click_through_rate': post_data.get('click_through_rate', 0.0)
+            }
+            for post_data in post_analytics
+            if post_data.get('post_id') in post_id_map
+        ]
+        
+        if post_analytics_records:
+            db.execute(insert(PostAnalytics), post_analytics_records)
+        
+        db.execute(
+            update(SocialAccount).where(SocialAccount.id == social_account_id).values(
+                needs_sync=False,
+                last_synced_at=datetime.now()
+            )
+        )
         
         db.commit()
         
-        self.update_state(state='SUCCESS', meta={'progress': 100, 'status': 'Analytics synced successfully'})
+        update_state(state='SUCCESS', meta={'progress': 100, 'status': 'Analytics synced successfully'})
         
         return {
             'social_account_id': social_account_id,
             'platform': social_account.platform,
             'account_metrics': account_metrics,
-            'posts_analyzed': len(post_analytics),
+            'posts_analyzed': len(post_analytics_records),
             'synced_at': datetime.now()
         }
         
     except Exception as e:
-        self.update_state(
+        update_state(
             state='FAILURE',
             meta={'progress': 0, 'status': f'Analytics sync failed: {str(e)}'}
         )
@@ -101,6 +166,11 @@ def sync_platform_analytics(self, social_account_id: int):
     
     finally:
         db.close()
+        
+        try:
+            sync_lock.release()
+        except LockError:
+            pass  # Lock expired and may now belong to another run
 
 
 @celery_app.task
@@ -110,33 +180,53 @@ def sync_all_analytics():
     try:
         db = SessionLocal()
         
-        # Get all active social accounts
-        social_accounts = db.query(SocialAccount).filter(
-            SocialAccount.is_active == True
-        ).all()
+        # Get ids of active accounts that changed or have not been synced for a while
+        idle_cutoff = datetime.now() - timedelta(hours=settings.ANALYTICS_IDLE_SYNC_INTERVAL_HOURS)
+        
+        account_ids = [
+            account_id for (account_id,) in db.query(SocialAccount.id).filter(
+                SocialAccount.is_active == True,
+                or_(
+                    SocialAccount.needs_sync == True,
+                    SocialAccount.last_synced_at.is_(None),
+                    SocialAccount.last_synced_at < idle_cutoff
+                )
+            ).yield_per(1000)
+        ]
         
         synced_count = 0
         failed_count = 0
         
-        for account in social_accounts:
+        if account_ids and settings.ANALYTICS_INLINE_ASYNC:
+            # Sync in this worker, skipping a broker round trip per account
+            results = run_sync(sync_accounts_inline(account_ids))
+            
+            for account_id, result in zip(account_ids, results):
+                if isinstance(result, Exception):
+                    logger.error("Inline analytics sync failed for account %s: %s", account_id, result)
+                    failed_count += 1
+                else:
+                    synced_count += 1
+            
+        elif account_ids:
             try:
-                # Trigger individual sync
-                sync_platform_analytics.delay(account.id)
-                synced_count += 1
+                # Publish every sync over one producer instead of a .delay() per account
+                group(sync_platform_analytics.s(account_id) for account_id in account_ids).apply_async()
+                synced_count = len(account_ids)
                 
-            except Exception as e:
-                print(f"Failed to sync analytics for account {account.id}: {e}")
-                failed_count += 1
+            except Exception:
+                logger.exception("Failed to queue analytics sync for %d accounts", len(account_ids))
+                failed_count = len(account_ids)
         
         return {
-            'total_accounts': len(social_accounts),
+            'total_accounts': len(account_ids),
             'synced_count': synced_count,
             'failed_count': failed_count,
             'timestamp': datetime.now()
         }
         
-    except Exception as e:
-        print(f"Error in sync_all_analytics: {e}")
+    except Exception:
+        logger.exception("Error in sync_all_analytics")
         raise
     
     finally:
@@ -156,8 +246,12 @@ def generate_analytics_report(self, user_id: int, period_days: int = 30):
         # Update task progress
         self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Collecting analytics data...'})
         
-        # Get user's social accounts
-        social_accounts = db.query(SocialAccount).filter(
+        # Get user's social accounts; only the columns the report reads, and
+        # any relationship access raises instead of issuing a lazy SELECT
+        social_accounts = db.query(SocialAccount).options(
+            load_only(SocialAccount.platform, SocialAccount.account_name),
+            raiseload('*')
+        ).filter(
             SocialAccount.user_id == user_id,
             SocialAccount.is_active == True
         ).all()
@@ -176,6 +270,67 @@ def generate_analytics_report(self, user_id: int, period_days: int = 30):
             }
         }
         
+        account_ids = [account.id for account in social_accounts]
+        analytics_by_account = {}
+        top_posts_by_account = defaultdict(list)
+        
+        if account_ids:
+            # Analytics for every account in one query, grouped in Python
+            all_analytics = db.execute(
+                select(Analytics).options(
+                    load_only(
+                        Analytics.social_account_id,
+                        Analytics.followers_count,
+                        Analytics.posts_count,
+                        Analytics.date,
+                        Analytics.engagement_growth
+                    ),
+                    raiseload('*')
+                ).where(
+                    Analytics.social_account_id.in_(account_ids),
+                    Analytics.date >= start_date
+                ).order_by(Analytics.social_account_id, Analytics.date.asc())
+            ).scalars().all()
+            
+            analytics_by_account = {
+                account_id: list(records)
+                for account_id, records in groupby(all_analytics, key=lambda record: record.social_account_id)
+            }
+            
+            # Top 5 posts per account in one windowed query
+            ranked_posts = select(
+                Post.social_account_id,
+                Post.title,
+                Post.posted_at,
+                PostAnalytics.likes,
+                PostAnalytics.comments,
+                PostAnalytics.engagement_rate,
+                func.row_number().over(
+                    partition_by=Post.social_account_id,
+                    order_by=PostAnalytics.engagement_rate.desc()
+                ).label('rn')
+            ).join(
+                PostAnalytics, Post.id == PostAnalytics.post_id
+            ).where(
+                Post.social_account_id.in_(account_ids),
+                Post.posted_at >= start_date
+            ).subquery()
+            
+            top_posts = db.execute(
+                select(ranked_posts).where(
+                    ranked_posts.c.rn <= 5
+                ).order_by(ranked_posts.c.social_account_id, ranked_posts.c.rn)
+            ).all()
+            
+            for post in top_posts:
+                top_posts_by_account[post.social_account_id].append({
+                    'title': post.title,
+                    'posted_at': post.posted_at,
+                    'likes': post.likes,
+                    'comments': post.comments,
+                    'engagement_rate': post.engagement_rate
+                })
+        
         # Process each platform
         for i, account in enumerate(social_accounts):
             progress = int(20 + (i / len(social_accounts)) * 60)
@@ -184,11 +339,7 @@ def generate_analytics_report(self, user_id: int, period_days: int = 30):
                 meta={'progress': progress, 'status': f'Processing {account.platform} analytics...'}
             )
             
-            # Get analytics data for this platform
-            analytics_data = db.query(Analytics).filter(
-                Analytics.social_account_id == account.id,
-                Analytics.date >= start_date
-            ).order_by(Analytics.date.asc()).all()
+            analytics_data = analytics_by_account.get(account.id)
             
             if analytics_data:
                 first_record = analytics_data[0]
@@ -212,24 +363,7 @@ def generate_analytics_report(self, user_id: int, period_days: int = 30):
                     ]
                 }
                 
-                # Get top performing posts
-                posts = db.query(Post, PostAnalytics).join(
-                    PostAnalytics, Post.id == PostAnalytics.post_id
-                ).filter(
-                    Post.social_account_id == account.id,
-                    Post.posted_at >= start_date
-                ).order_by(PostAnalytics.engagement_rate.desc()).limit(5).all()
-                
-                platform_data['top_posts'] = [
-                    {
-                        'title': post.title,
-                        'posted_at': post.posted_at,
-                        'likes': analytics.likes,
-                        'comments': analytics.comments,
-                        'engagement_rate': analytics.engagement_rate
-                    }
-                    for post, analytics in posts
-                ]
+                platform_data['top_posts'] = top_posts_by_account[account.id]
                 
                 report_data['platforms'][account.platform] = platform_data
                 
@@ -269,31 +403,32 @@ def generate_daily_report():
     try:
         db = SessionLocal()
         
-        # Get all users with active social accounts
+        # Stream all users with active social accounts
         users_with_accounts = db.query(SocialAccount.user_id).filter(
             SocialAccount.is_active == True
-        ).distinct().all()
+        ).distinct().yield_per(1000)
         
         reports_generated = 0
+        total_users = 0
         
-        for user_tuple in users_with_accounts:
-            user_id = user_tuple[0]
+        for (user_id,) in users_with_accounts:
+            total_users += 1
             try:
                 # Generate report for this user
                 generate_analytics_report.delay(user_id, 7)  # 7-day report
                 reports_generated += 1
                 
-            except Exception as e:
-                print(f"Failed to generate report for user {user_id}: {e}")
+            except Exception:
+                logger.exception("Failed to generate report for user %s", user_id)
         
         return {
             'reports_generated': reports_generated,
-            'total_users': len(users_with_accounts),
+            'total_users': total_users,
             'timestamp': datetime.now()
         }
         
-    except Exception as e:
-        print(f"Error in generate_daily_report: {e}")
+    except Exception:
+        logger.exception("Error in generate_daily_report")
         raise
     
     finally:
@@ -306,7 +441,7 @@ def analyze_post_performance(self, post_id: int):
     
     try:
         db = SessionLocal()
-        post = db.query(Post).filter(Post.id == post_id).first()
+        post = db.get(Post, post_id)
         
         if not post:
             raise Exception("Post not found")
@@ -338,24 +473,20 @@ def analyze_post_performance(self, post_id: int):
         else:
             performance = "poor"
         
-        # Get comparison data (average of user's other posts)
-        user_posts_avg = db.query(
-            db.func.avg(PostAnalytics.engagement_rate),
-            db.func.avg(PostAnalytics.likes),
-            db.func.avg(PostAnalytics.comments)
-        ).join(Post).filter(
-            Post.user_id == post.user_id,
-            Post.id != post_id
-        ).first()
+        # Get comparison data (average of user's other posts, cached)
+        other_count, other_engagement, other_likes, other_comments = get_other_post_totals(db, post.user_id, post_id)
         
         comparison = {}
-        if user_posts_avg[0]:  # If there are other posts to compare
-            comparison = {
-                'avg_engagement_rate': float(user_posts_avg[0]),
-                'avg_likes': float(user_posts_avg[1]),
-                'avg_comments': float(user_posts_avg[2]),
-                'performance_vs_average': engagement_rate / float(user_posts_avg[0]) if user_posts_avg[0] > 0 else 1.0
-            }
+        if other_count > 0:
+            avg_engagement_rate = other_engagement / other_count
+            
+            if avg_engagement_rate:  # If there are other posts to compare
+                comparison = {
+                    'avg_engagement_rate': float(avg_engagement_rate),
+                    'avg_likes': float(other_likes / other_count),
+                    'avg_comments': float(other_comments / other_count),
+                    'performance_vs_average': engagement_rate / float(avg_engagement_rate) if avg_engagement_rate > 0 else 1.0
+                }
         
         analysis = {
             'post_id': post_id,
@@ -388,6 +519,74 @@ def analyze_post_performance(self, post_id: int):
         db.close()
 
 
+def post_totals_query():
+    """Row count and metric sums over post analytics, for averaging"""
+    
+    return select(
+        func.count(PostAnalytics.id),
+        func.coalesce(func.sum(PostAnalytics.engagement_rate), 0.0),
+        func.coalesce(func.sum(PostAnalytics.likes), 0),
+        func.coalesce(func.sum(PostAnalytics.comments), 0)
+    )
+
+
+def get_other_post_totals(db: Session, user_id: int, post_id: int) -> List:
+    """Post analytics totals across a user's posts other than post_id
+    
+    The user's totals and each post's share of them are cached together in
+    Redis, so every post of the user is compared against one snapshot.
+    """
+    
+    key = f"user_avg:{user_id}"
+    snapshot = cache.get_json(key)
+    
+    if snapshot is None:
+        rows = db.execute(
+            post_totals_query()
+            .add_columns(PostAnalytics.post_id)
+            .join(Post)
+            .where(Post.user_id == user_id)
+            .group_by(PostAnalytics.post_id)
+        ).all()
+        
+        # JSON object keys are strings
+        posts = {str(row[-1]): [float(value) for value in row[:-1]] for row in rows}
+        snapshot = {
+            'totals': [sum(column) for column in zip(*posts.values())] or [0.0] * 4,
+            'posts': posts
+        }
+        cache.set_json(key, snapshot, USER_TOTALS_TTL)
+    
+    post_totals = snapshot['posts'].get(str(post_id), [0.0] * 4)
+    
+    return [total - own for total, own in zip(snapshot['totals'], post_totals)]
+
+
+async def sync_accounts_inline(account_ids: List[int]) -> List:
+    """Sync several accounts concurrently, returning each result or exception"""
+    
+    semaphore = asyncio.Semaphore(INLINE_SYNC_CONCURRENCY)
+    
+    async def sync_one(account_id):
+        async with semaphore:
+            return await asyncio.to_thread(sync_account_analytics, account_id)
+    
+    return await asyncio.gather(*(sync_one(account_id) for account_id in account_ids), return_exceptions=True)
+
+
+async def fetch_platform_analytics(service):
+    """Fetch account metrics and post analytics from a platform concurrently"""
+    
+    # Refresh once up front; otherwise both calls may see the expired token
+    # and refresh it at the same time
+    await asyncio.to_thread(service.refresh_token_if_needed)
+    
+    return await asyncio.gather(
+        service.get_account_metrics_async(),
+        service.get_posts_analytics_async()
+    )
+
+
 def get_analytics_service(platform: str, social_account):
     """Get the appropriate analytics service for a platform"""
     
@@ -416,30 +615,83 @@ def cleanup_old_analytics():
         # Keep only last 90 days of daily analytics
         cutoff_date = datetime.now() - timedelta(days=90)
         
-        deleted_analytics = db.query(Analytics).filter(
-            Analytics.date < cutoff_date,
-            Analytics.period_type == 'daily'
-        ).delete()
-        
         # Keep only last 30 days of post analytics
         post_cutoff_date = datetime.now() - timedelta(days=30)
         
-        deleted_post_analytics = db.query(PostAnalytics).filter(
-            PostAnalytics.collected_at < post_cutoff_date
-        ).delete()
+        dropped_partitions = []
         
-        db.commit()
+        # Single server-side DELETE per table, both in one transaction
+        with db.begin():
+            # On partitioned PostgreSQL tables, drop whole expired months first;
+            # the DELETEs below then only touch the boundary and DEFAULT partitions
+            if partitions.is_partitioned(db, 'post_analytics'):
+                for name in partitions.expired_partitions(db, 'post_analytics', post_cutoff_date):
+                    db.execute(text(f"DROP TABLE {name}"))
+                    dropped_partitions.append(name)
+            
+            if partitions.is_partitioned(db, 'analytics'):
+                for name in partitions.expired_partitions(db, 'analytics', cutoff_date):
+                    # Only daily rows expire; keep months that hold weekly/monthly rollups
+                    has_rollups = db.execute(text(
+                        f"SELECT EXISTS (SELECT 1 FROM {name} WHERE period_type IS DISTINCT FROM 'daily')"
+                    )).scalar()
+                    
+                    if not has_rollups:
+                        db.execute(text(f"DROP TABLE {name}"))
+                        dropped_partitions.append(name)
+            
+            deleted_analytics = db.execute(
+                delete(Analytics).where(
+                    Analytics.date < cutoff_date,
+                    Analytics.period_type == 'daily'
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+            
+            deleted_post_analytics = db.execute(
+                delete(PostAnalytics).where(
+                    PostAnalytics.collected_at < post_cutoff_date
+                ).execution_options(synchronize_session=False)
+            ).rowcount
         
         return {
             'deleted_analytics': deleted_analytics,
             'deleted_post_analytics': deleted_post_analytics,
+            'dropped_partitions': dropped_partitions,
             'cutoff_date': cutoff_date,
             'timestamp': datetime.now()
         }
         
-    except Exception as e:
+    except Exception:
         db.rollback()
         raise
     
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@celery_app.task
+def maintain_analytics_partitions():
+    """Create upcoming monthly partitions for the partitioned analytics tables"""
+    
+    try:
+        db = SessionLocal()
+        
+        ensured = []
+        
+        for table in partitions.PARTITIONED_TABLES:
+            if partitions.is_partitioned(db, table):
+                ensured.extend(partitions.ensure_partitions(db, table))
+        
+        db.commit()
+        
+        return {
+            'partitions': ensured,
+            'timestamp': datetime.now()
+        }
+        
+    except Exception:
+        db.rollback()
+        raise
+    
+    finally:
+        db.close()
@@ -1,6 +1,11 @@
+import threading
 from celery import Celery
+from celery.concurrency.prefork import TaskPool as PreforkPool
 from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown, worker_ready
 from app.core.config import settings
+from app.core.database import engine
+from app.services import async_http
 
 # Create Celery instance
 celery_app = Celery(
@@ -27,6 +32,17 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # Network-bound tasks go to a threaded worker, ffmpeg/Pillow work to prefork;
+    # anything unrouted stays on the default "celery" queue served by the io worker
+    task_routes={
+        'app.tasks.analytics_tasks.*': {'queue': 'io'},
+        'app.tasks.posting_tasks.*': {'queue': 'io'},
+        'app.tasks.file_tasks.*': {'queue': 'cpu'},
+    },
+    # Keep the beat schedule in Redis so schedules added at runtime by
+    # workers are seen by the beat process
+    beat_scheduler="redbeat.RedBeatScheduler",
+    redbeat_redis_url=settings.REDIS_URL,
 )
 
 # Periodic tasks schedule
@@ -51,6 +67,56 @@ celery_app.conf.beat_schedule = {
         'task': 'app.tasks.analytics_tasks.generate_daily_report',
         'schedule': crontab(hour=8, minute=0),  # Daily at 8 AM
     },
+    # Keep monthly analytics partitions created ahead of time (PostgreSQL only)
+    'maintain-analytics-partitions': {
+        'task': 'app.tasks.analytics_tasks.maintain_analytics_partitions',
+        'schedule': crontab(hour=1, minute=0),  # Daily at 1 AM
+    },
 }
 
-celery_app.conf.timezone = 'UTC'
\ No newline at end of file
+celery_app.conf.timezone = 'UTC'
+
+
+@worker_process_init.connect
+def _reset_async_http(**_):
+    """Give each forked worker its own event loop and HTTP connection pool"""
+    async_http.reset()
+
+
+@worker_process_init.connect
+def _reset_db_pool(**_):
+    """Drop connections inherited from the parent so each child opens its own"""
+    # close=False leaves the parent's sockets alone instead of closing them under it
+    engine.dispose(close=False)
+
+
+@worker_process_shutdown.connect
+def _close_db_pool(**_):
+    """Close the worker's pooled connections on exit"""
+    engine.dispose()
+
+
+def _prewarm_platform_services():
+    """Connect to the platform APIs in the background so the first post finds a warm pool"""
+    from app.tasks.posting_tasks import _SERVICES
+    
+    def prewarm():
+        # One service per API host; Facebook and Instagram share the Graph API
+        for service_class in {cls.prewarm_url: cls for cls in _SERVICES.values()}.values():
+            service_class.prewarm()
+    
+    threading.Thread(target=prewarm, name="prewarm-platform-services", daemon=True).start()
+
+
+@worker_process_init.connect
+def _prewarm_forked_worker(**_):
+    """Prewarm platform connections in each forked worker"""
+    _prewarm_platform_services()
+
+
+@worker_ready.connect
+def _prewarm_thread_worker(sender, **_):
+    """Prewarm platform connections in workers that never fork (e.g. the threads pool)"""
+    # Prefork workers prewarm per child; connections opened here would leak into later forks
+    if not isinstance(sender.pool, PreforkPool):
+        _prewarm_platform_services()
@@ -1,16 +1,44 @@
-from celery import current_task
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import os
 import subprocess
+import logging
 from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, select, update
 from sqlalchemy.orm import Session
 
 from app.tasks.celery_app import celery_app
 from app.core.database import SessionLocal
-from app.models.models import Post
+from app.models.models import Post, PostAnalytics
 from app.core.config import settings
 
 
+logger = logging.getLogger(__name__)
+
+
+# Rows fetched per round trip and deleted per statement in cleanup_old_files
+CLEANUP_BATCH_SIZE = 500
+
+# Posts whose status batch_process_files writes per commit
+STATUS_COMMIT_BATCH_SIZE = 50
+
+# Files batch_process_files works on at once
+BATCH_MAX_WORKERS = os.cpu_count() or 1
+
+DEFAULT_VIDEO_CODEC = 'libx264'
+
+# Per-codec (input args, encoder args); all target roughly CRF 23 quality
+VIDEO_CODEC_ARGS = {
+    'libx264': ([], ['-crf', '23', '-preset', 'medium']),
+    'h264_nvenc': (['-hwaccel', 'auto'], ['-cq', '23', '-preset', 'p4']),
+    'h264_qsv': (['-hwaccel', 'auto'], ['-global_quality', '23', '-preset', 'medium']),
+    'h264_vaapi': (
+        ['-hwaccel', 'auto', '-vaapi_device', '/dev/dri/renderD128'],
+        ['-vf', 'format=nv12,hwupload', '-qp', '23']
+    ),
+}
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -19,15 +47,19 @@ def get_db():
         db.close()
 
 
+def post_exists(db: Session, post_id: int) -> bool:
+    """Check that a post exists without loading it"""
+    return db.scalar(select(exists().where(Post.id == post_id)))
+
+
 @celery_app.task(bind=True)
 def process_uploaded_file(self, post_id: int, file_path: str, file_type: str):
     """Process uploaded file - compress, validate, etc."""
     
     try:
         db = SessionLocal()
-        post = db.query(Post).filter(Post.id == post_id).first()
         
-        if not post:
+        if not post_exists(db, post_id):
             raise Exception(f"Post {post_id} not found")
         
         # Update task progress
@@ -44,7 +76,7 @@ def process_uploaded_file(self, post_id: int, file_path: str, file_type: str):
             self.update_state(state='PROGRESS', meta={'progress': 50, 'status': 'Processing video...'})
         
         # Update post status
-        post.status = "processed"
+        db.execute(update(Post).where(Post.id == post_id).values(status="processed"))
         db.commit()
         
         self.update_state(state='SUCCESS', meta={'progress': 100, 'status': 'File processed successfully'})
@@ -58,7 +90,7 @@ def process_uploaded_file(self, post_id: int, file_path: str, file_type: str):
         
     except Exception as e:
         db.rollback()
-        post.status = "failed"
+        db.execute(update(Post).where(Post.id == post_id).values(status="failed"))
         db.commit()
         
         self.update_state(
@@ -77,28 +109,47 @@ def generate_thumbnail(self, post_id: int, video_path: str):
     
     try:
         db = SessionLocal()
-        post = db.query(Post).filter(Post.id == post_id).first()
         
-        if not post:
+        if not post_exists(db, post_id):
             raise Exception(f"Post {post_id} not found")
         
         # Generate thumbnail using ffmpeg
         thumbnail_path = video_path.replace(os.path.splitext(video_path)[1], '_thumb.jpg')
         
+        # Seek on the input so ffmpeg jumps to the nearest keyframe instead of
+        # decoding every frame up to the 1 second mark
         cmd = [
             'ffmpeg',
-            '-i', video_path,
             '-ss', '00:00:01.000',  # Take frame at 1 second
-            '-vframes', '1',
+            '-i', video_path,
+            '-frames:v', '1',
+            '-q:v', '3',
+            '-an', '-sn',  # Skip audio and subtitle streams
             '-y',  # Overwrite output file
             thumbnail_path
         ]
         
         result = subprocess.run(cmd, capture_output=True, text=True)
         
+        if result.returncode != 0 or not os.path.exists(thumbnail_path):
+            # Some mobile uploads have sparse or broken keyframe indexes;
+            # retry with the slower decode-and-discard output seek
+            cmd = [
+                'ffmpeg',
+                '-i', video_path,
+                '-ss', '00:00:01.000',
+                '-frames:v', '1',
+                '-q:v', '3',
+                '-an', '-sn',
+                '-y',
+                thumbnail_path
+            ]
+            
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        
         if result.returncode == 0:
             # Update post with thumbnail path
-            post.thumbnail_path = thumbnail_path
+            db.execute(update(Post).where(Post.id == post_id).values(thumbnail_path=thumbnail_path))
             db.commit()
             
             return {
@@ -130,40 +181,47 @@ def cleanup_old_files():
         # Delete files older than 30 days that are not scheduled or posted
         cutoff_date = datetime.now() - timedelta(days=30)
         
-        old_posts = db.query(Post).filter(
+        # Stream only the columns needed instead of hydrating every Post
+        old_posts = db.query(Post.id, Post.file_path, Post.thumbnail_path).filter(
             Post.created_at < cutoff_date,
             Post.status.in_(["failed", "cancelled"])
-        ).all()
+        ).yield_per(CLEANUP_BATCH_SIZE)
         
-        deleted_count = 0
+        deleted_ids = []
         
-        for post in old_posts:
+        for post_id, file_path, thumbnail_path in old_posts:
             try:
-                # Delete file from disk
-                if post.file_path and os.path.exists(post.file_path):
-                    os.remove(post.file_path)
-                
-                # Delete thumbnail if exists
-                if post.thumbnail_path and os.path.exists(post.thumbnail_path):
-                    os.remove(post.thumbnail_path)
+                # Delete file and thumbnail from disk; a missing file is already gone
+                for path in (file_path, thumbnail_path):
+                    if path:
+                        try:
+                            os.unlink(path)
+                        except FileNotFoundError:
+                            pass
                 
-                # Delete post record
-                db.delete(post)
-                deleted_count += 1
+                deleted_ids.append(post_id)
                 
-            except Exception as e:
-                print(f"Error deleting post {post.id}: {e}")
+            except Exception:
+                logger.exception("Error deleting post %s", post_id)
                 continue
         
+        # Delete post records in batches; detach their analytics first, as the ORM delete did
+        for i in range(0, len(deleted_ids), CLEANUP_BATCH_SIZE):
+            batch_ids = deleted_ids[i:i + CLEANUP_BATCH_SIZE]
+            db.execute(update(PostAnalytics).where(PostAnalytics.post_id.in_(batch_ids)).values(post_id=None))
+            db.execute(delete(Post).where(Post.id.in_(batch_ids)))
+        
         db.commit()
         
+        deleted_count = len(deleted_ids)
+        
         return {
             'deleted_count': deleted_count,
             'cutoff_date': cutoff_date,
             'status': 'success'
         }
         
-    except Exception as e:
+    except Exception:
         db.rollback()
         raise
     
@@ -176,14 +234,20 @@ def process_image(file_path: str) -> str:
     
     try:
         with Image.open(file_path) as img:
+            max_size = (1920, 1080)
+            
+            # Let the JPEG decoder downscale by a power of two while decoding,
+            # never below max_size, so large photos are not fully decoded
+            img.draft('RGB', max_size)
+            
             # Convert to RGB if necessary
             if img.mode in ('RGBA', 'LA', 'P'):
                 img = img.convert('RGB')
             
-            # Resize if too large (max 1920x1080)
-            max_size = (1920, 1080)
+            # Resize if too large (max 1920x1080); reducing_gap does a cheap
+            # box reduce first so LANCZOS only runs over the last 3x
             if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
+                img.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
             
             # Save with compression
             processed_path = file_path.replace(os.path.splitext(file_path)[1], '_processed.jpg')
@@ -200,22 +264,18 @@ def process_video(file_path: str) -> str:
     
     try:
         processed_path = file_path.replace(os.path.splitext(file_path)[1], '_processed.mp4')
+        codec = settings.FFMPEG_VIDEO_CODEC
         
-        # Use ffmpeg to compress video
-        cmd = [
-            'ffmpeg',
-            '-i', file_path,
-            '-c:v', 'libx264',
-            '-crf', '23',  # Constant Rate Factor for quality
-            '-preset', 'medium',
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-movflags', '+faststart',  # Optimize for web streaming
-            '-y',  # Overwrite output file
-            processed_path
-        ]
+        # Use ffmpeg to compress video, on the GPU encoder if one is configured
+        result = subprocess.run(build_video_command(file_path, processed_path, codec), capture_output=True, text=True)
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0 and codec != DEFAULT_VIDEO_CODEC:
+            # Hardware encoder missing or busy on this host; fall back to x264
+            result = subprocess.run(
+                build_video_command(file_path, processed_path, DEFAULT_VIDEO_CODEC),
+                capture_output=True,
+                text=True
+            )
         
         if result.returncode == 0:
             return processed_path
@@ -226,6 +286,25 @@ def process_video(file_path: str) -> str:
         raise Exception(f"Video processing failed: {str(e)}")
 
 
+def build_video_command(file_path: str, processed_path: str, codec: str) -> list:
+    """Build the ffmpeg transcode command for a video codec"""
+    
+    input_args, codec_args = VIDEO_CODEC_ARGS.get(codec, ([], []))
+    
+    return [
+        'ffmpeg',
+        *input_args,
+        '-i', file_path,
+        '-c:v', codec,
+        *codec_args,
+        '-c:a', 'aac',
+        '-b:a', '128k',
+        '-movflags', '+faststart',  # Optimize for web streaming
+        '-y',  # Overwrite output file
+        processed_path
+    ]
+
+
 @celery_app.task(bind=True)
 def batch_process_files(self, post_ids: list):
     """Process multiple files in batch"""
@@ -233,49 +312,63 @@ def batch_process_files(self, post_ids: list):
     total_files = len(post_ids)
     processed_files = []
     failed_files = []
+    processed_ids = []
     
-    for i, post_id in enumerate(post_ids):
-        try:
-            db = SessionLocal()
-            post = db.query(Post).filter(Post.id == post_id).first()
-            
-            if post:
+    db = SessionLocal()
+    
+    try:
+        # Load the columns needed for every post in one query
+        posts = {
+            post.id: post
+            for post in db.execute(
+                select(Post.id, Post.title, Post.file_path, Post.file_type).where(Post.id.in_(post_ids))
+            )
+        }
+        
+        batch = [posts[post_id] for post_id in post_ids if post_id in posts]
+        
+        # Files are independent and the heavy lifting (ffmpeg subprocesses,
+        # Pillow decode/resample/encode) releases the GIL, so threads scale
+        # across cores; prefork workers are daemonic and cannot fork a pool
+        with ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS) as executor:
+            for done, (post, processed_path, error) in enumerate(executor.map(process_post_file, batch), start=1):
+                if error is None:
+                    if post.file_type == "video":
+                        # Also generate thumbnail
+                        generate_thumbnail.delay(post.id, post.file_path)
+                    
+                    processed_ids.append(post.id)
+                    processed_files.append({
+                        'post_id': post.id,
+                        'title': post.title,
+                        'processed_path': processed_path
+                    })
+                else:
+                    failed_files.append({
+                        'post_id': post.id,
+                        'error': error
+                    })
+                
                 # Update progress
-                progress = int((i / total_files) * 100)
                 self.update_state(
                     state='PROGRESS',
                     meta={
-                        'progress': progress,
-                        'current': i + 1,
+                        'progress': int((done / len(batch)) * 100),
+                        'current': done,
                         'total': total_files,
-                        'status': f'Processing {post.title}...'
+                        'status': f'Processed {post.title}'
                     }
                 )
                 
-                # Process file
-                if post.file_type == "image":
-                    processed_path = process_image(post.file_path)
-                elif post.file_type == "video":
-                    processed_path = process_video(post.file_path)
-                    # Also generate thumbnail
-                    generate_thumbnail.delay(post.id, post.file_path)
-                
-                post.status = "processed"
-                db.commit()
-                
-                processed_files.append({
-                    'post_id': post_id,
-                    'title': post.title,
-                    'processed_path': processed_path
-                })
-            
-            db.close()
-            
-        except Exception as e:
-            failed_files.append({
-                'post_id': post_id,
-                'error': str(e)
-            })
+                # Persist statuses periodically so a crash mid-batch keeps finished work
+                if len(processed_ids) >= STATUS_COMMIT_BATCH_SIZE:
+                    mark_posts_processed(db, processed_ids)
+                    processed_ids = []
+        
+        mark_posts_processed(db, processed_ids)
+        
+    finally:
+        db.close()
     
     return {
         'total_files': total_files,
@@ -283,4 +376,29 @@ def batch_process_files(self, post_ids: list):
         'failed_files': failed_files,
         'success_count': len(processed_files),
         'failure_count': len(failed_files)
-    }
\ No newline at end of file
+    }
+
+
+def process_post_file(post) -> tuple:
+    """Process one post's file, returning (post, processed_path, error)"""
+    
+    try:
+        if post.file_type == "image":
+            processed_path = process_image(post.file_path)
+        elif post.file_type == "video":
+            processed_path = process_video(post.file_path)
+        else:
+            raise Exception(f"Unsupported file type: {post.file_type}")
+        
+        return post, processed_path, None
+        
+    except Exception as e:
+        return post, None, str(e)
+
+
+def mark_posts_processed(db: Session, post_ids: list):
+    """Set status to processed for a batch of posts in one statement"""
+    
+    if post_ids:
+        db.execute(update(Post).where(Post.id.in_(post_ids)).values(status="processed"))
+        db.commit()
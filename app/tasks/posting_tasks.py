@@ -1,11 +1,19 @@
-from celery import current_task
+from celery import chord, group
+from celery.utils.time import get_exponential_backoff_interval
+import logging
 from datetime import datetime, timedelta
+import hashlib
+import json
+from sqlalchemy import and_, or_, select, text, update
 from sqlalchemy.orm import Session
+from types import MappingProxyType
 from typing import List
 
 from app.tasks.celery_app import celery_app
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, db_session
 from app.models.models import Post, SocialAccount, Schedule
+from app.services.base_service import is_transient_error
+from app.services.circuit_breaker import PlatformUnavailable, get_breaker
 from app.services.instagram_service import InstagramService
 from app.services.facebook_service import FacebookService
 from app.services.twitter_service import TwitterService
@@ -13,145 +21,292 @@ from app.services.youtube_service import YouTubeService
 from app.services.tiktok_service import TikTokService
 
 
-@celery_app.task(bind=True)
+logger = logging.getLogger(__name__)
+
+
+# Service class per platform name
+_SERVICES = MappingProxyType({
+    'instagram': InstagramService,
+    'facebook': FacebookService,
+    'twitter': TwitterService,
+    'youtube': YouTubeService,
+    'tiktok': TikTokService
+})
+
+# Retries of a post after a transient platform failure (timeout, 429, 5xx)
+MAX_POST_RETRIES = 5
+RETRY_BACKOFF = 2
+RETRY_BACKOFF_MAX = 60
+
+# Post statuses post_to_platform may claim; "posting" marks a claimed post
+CLAIMABLE_POST_STATUSES = ("uploaded", "processed", "scheduled", "retrying", "failed")
+
+# A "posting" claim older than this is treated as abandoned (matches task_time_limit)
+POSTING_CLAIM_TIMEOUT = timedelta(minutes=30)
+
+
+@celery_app.task(bind=True, max_retries=MAX_POST_RETRIES)
 def post_to_platform(self, post_id: int, platform: str, social_account_id: int):
     """Post content to a specific social media platform"""
     
+    key = idempotency_key(post_id, platform, social_account_id)
+    
+    with db_session() as db:
+        try:
+            post = db.get(Post, post_id)
+            social_account = db.get(SocialAccount, social_account_id)
+            
+            if not post or not social_account:
+                raise Exception("Post or social account not found")
+            
+            # An earlier attempt already published this post to this account
+            if post.idempotency_key == key and post.platform_post_id:
+                return {
+                    'post_id': post_id,
+                    'platform': platform,
+                    'platform_post_id': post.platform_post_id,
+                    'posted_at': post.posted_at,
+                    'status': 'success'
+                }
+            
+            # Claim the post by moving it to "posting", so a concurrent run of the
+            # same post (e.g. a redelivered message) skips it instead of posting twice
+            if not claim_post(db, post_id):
+                logger.warning("Post %s is %s, skipping post to %s", post_id, post.status, platform)
+                return {
+                    'post_id': post_id,
+                    'platform': platform,
+                    'status': 'skipped',
+                    'reason': f'Post is {post.status}'
+                }
+            
+            # Commit the claim now; no lock is held during the upload
+            db.commit()
+            
+            # Update task progress
+            self.update_state(state='PROGRESS', meta={'progress': 10, 'status': f'Posting to {platform}...'})
+            
+            # Get appropriate service
+            service = get_platform_service(platform, social_account, post.file_path)
+            
+            if not service:
+                raise Exception(f"Service not available for platform: {platform}")
+            
+            # Update progress
+            self.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Uploading content...'})
+            
+            # Post content
+            result = post_content(service, platform, post, key)
+            
+            # Update progress
+            self.update_state(state='PROGRESS', meta={'progress': 80, 'status': 'Finalizing post...'})
+            
+            # Update post record
+            # The key is stored together with the result it produced
+            post.platform_post_id = result.get('post_id')
+            post.idempotency_key = key
+            post.posted_at = datetime.now()
+            post.status = "posted"
+            post.social_account_id = social_account_id
+            social_account.needs_sync = True
+            
+            # Store platform-specific data
+            merge_platform_data(db, post, result)
+            
+            db.commit()
+            
+            self.update_state(state='SUCCESS', meta={'progress': 100, 'status': 'Posted successfully'})
+            
+            return {
+                'post_id': post_id,
+                'platform': platform,
+                'platform_post_id': result.get('post_id'),
+                'posted_at': post.posted_at,
+                'status': 'success'
+            }
+            
+        except Exception as e:
+            # The session may be mid-failure (e.g. the commit itself raised)
+            db.rollback()
+            
+            if should_retry(self, e):
+                # Release the claim for the retry
+                db.execute(update(Post).where(Post.id == post_id, Post.status == "posting").values(status="retrying"))
+                db.commit()
+                raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
+            
+            # Update post status to failed on a fresh session
+            with SessionLocal() as failure_db:
+                failure_db.execute(update(Post).where(Post.id == post_id).values(status="failed"))
+                failure_db.commit()
+            
+            self.update_state(
+                state='FAILURE',
+                meta={'progress': 0, 'status': f'Posting failed: {str(e)}'}
+            )
+            raise
+
+
+@celery_app.task(bind=True)
+def post_to_multiple_platforms(self, post_id: int, platform_ids: List[str]):
+    """Post content to multiple platforms"""
+    
+    claimed = False
+    
     try:
-        db = SessionLocal()
-        
-        # Get post and social account
-        post = db.query(Post).filter(Post.id == post_id).first()
-        social_account = db.query(SocialAccount).filter(SocialAccount.id == social_account_id).first()
-        
-        if not post or not social_account:
-            raise Exception("Post or social account not found")
-        
-        # Update task progress
-        self.update_state(state='PROGRESS', meta={'progress': 10, 'status': f'Posting to {platform}...'})
-        
-        # Get appropriate service
-        service = get_platform_service(platform, social_account)
-        
-        if not service:
-            raise Exception(f"Service not available for platform: {platform}")
-        
-        # Update progress
-        self.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Uploading content...'})
-        
-        # Post content
-        result = service.post_content(
-            file_path=post.file_path,
-            caption=post.description,
-            title=post.title
+        with db_session() as db:
+            post = db.get(Post, post_id)
+            
+            if not post:
+                raise Exception("Post not found")
+            
+            # Claim the post before dispatching, so the beat or an eta dispatch of
+            # the same post skips it; finalize_post moves it out of "posting"
+            if not claim_post(db, post_id):
+                logger.warning("Post %s is %s, skipping post to %s", post_id, post.status, ", ".join(platform_ids))
+                return {
+                    'post_id': post_id,
+                    'status': 'skipped',
+                    'reason': f'Post is {post.status}'
+                }
+            
+            db.commit()
+            claimed = True
+            
+            # First active social account per requested platform, in one query
+            accounts = {}
+            for account in db.execute(
+                select(SocialAccount.platform, SocialAccount.id).where(
+                    SocialAccount.user_id == post.user_id,
+                    SocialAccount.platform.in_(platform_ids),
+                    SocialAccount.is_active == True
+                ).order_by(SocialAccount.id)
+            ):
+                accounts.setdefault(account.platform, account.id)
+        
+        missing = [
+            {
+                'platform': platform,
+                'status': 'failed',
+                'error': 'No active social account found'
+            }
+            for platform in platform_ids if platform not in accounts
+        ]
+        
+        header = [
+            attempt_platform_post.s(post_id, platform, accounts[platform])
+            for platform in platform_ids if platform in accounts
+        ]
+        
+        if not header:
+            return finalize_post(missing, post_id, len(platform_ids))
+        
+        # Upload to every platform in parallel; finalize_post records the
+        # outcome once all of them have finished
+        self.update_state(
+            state='PROGRESS',
+            meta={'progress': 10, 'status': f'Posting to {len(header)} platforms...'}
         )
         
-        # Update progress
-        self.update_state(state='PROGRESS', meta={'progress': 80, 'status': 'Finalizing post...'})
-        
-        # Update post record
-        post.platform_post_id = result.get('post_id')
-        post.posted_at = datetime.now()
-        post.status = "posted"
-        post.social_account_id = social_account_id
-        
-        # Store platform-specific data
-        if post.platform_data:
-            post.platform_data.update(result)
-        else:
-            post.platform_data = result
-        
-        db.commit()
-        
-        self.update_state(state='SUCCESS', meta={'progress': 100, 'status': 'Posted successfully'})
+        result = chord(header)(finalize_post.s(post_id, len(platform_ids), missing))
         
         return {
             'post_id': post_id,
-            'platform': platform,
-            'platform_post_id': result.get('post_id'),
-            'posted_at': post.posted_at,
-            'status': 'success'
+            'finalize_task_id': result.id,
+            'total_platforms': len(platform_ids),
+            'status': 'dispatched'
         }
         
     except Exception as e:
-        # Update post status to failed
-        if 'post' in locals():
-            post.status = "failed"
-            db.commit()
+        if claimed:
+            # Release the claim; nothing was dispatched, so the post can be tried again
+            with db_session() as release_db:
+                release_db.execute(
+                    update(Post).where(Post.id == post_id, Post.status == "posting").values(status="failed")
+                )
         
         self.update_state(
             state='FAILURE',
-            meta={'progress': 0, 'status': f'Posting failed: {str(e)}'}
+            meta={'error': f'Multi-platform posting failed: {str(e)}'}
         )
         raise
-    
-    finally:
-        db.close()
 
 
-@celery_app.task(bind=True)
-def post_to_multiple_platforms(self, post_id: int, platform_ids: List[str]):
-    """Post content to multiple platforms"""
+@celery_app.task(bind=True, max_retries=MAX_POST_RETRIES)
+def attempt_platform_post(self, post_id: int, platform: str, social_account_id: int) -> dict:
+    """Post content to one platform for post_to_multiple_platforms
+    
+    Failures are returned rather than raised so the chord callback still runs.
+    """
     
     try:
-        db = SessionLocal()
-        post = db.query(Post).filter(Post.id == post_id).first()
-        
-        if not post:
-            raise Exception("Post not found")
-        
-        results = []
-        total_platforms = len(platform_ids)
-        
-        for i, platform in enumerate(platform_ids):
-            try:
-                # Update progress
-                progress = int((i / total_platforms) * 100)
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'progress': progress,
-                        'current_platform': platform,
-                        'status': f'Posting to {platform}...'
-                    }
-                )
-                
-                # Get social account for this platform
-                social_account = db.query(SocialAccount).filter(
-                    SocialAccount.user_id == post.user_id,
-                    SocialAccount.platform == platform,
-                    SocialAccount.is_active == True
-                ).first()
-                
-                if not social_account:
-                    results.append({
-                        'platform': platform,
-                        'status': 'failed',
-                        'error': 'No active social account found'
-                    })
-                    continue
-                
-                # Post to platform
-                service = get_platform_service(platform, social_account)
-                result = service.post_content(
-                    file_path=post.file_path,
-                    caption=post.description,
-                    title=post.title
-                )
-                
-                results.append({
+        with db_session() as db:
+            post = db.get(Post, post_id)
+            social_account = db.get(SocialAccount, social_account_id)
+            
+            if not post or not social_account:
+                raise Exception("Post or social account not found")
+            
+            key = idempotency_key(post_id, platform, social_account_id)
+            publication_key = f"{platform}_publication"
+            
+            # A redelivered or retried attempt returns the recorded result instead of posting again
+            publication = (post.platform_data or {}).get(publication_key)
+            if publication and publication.get('idempotency_key') == key:
+                return {
                     'platform': platform,
                     'status': 'success',
+                    'platform_post_id': publication.get('platform_post_id'),
+                    'result': publication.get('result')
+                }
+            
+            service = get_platform_service(platform, social_account, post.file_path)
+            
+            if not service:
+                raise Exception(f"Service not available for platform: {platform}")
+            
+            result = post_content(service, platform, post, key)
+            
+            # Record the publication under its own top-level key so parallel
+            # attempts for other platforms don't overwrite it
+            merge_platform_data(db, post, {
+                publication_key: {
+                    'idempotency_key': key,
                     'platform_post_id': result.get('post_id'),
                     'result': result
-                })
-                
-            except Exception as e:
-                results.append({
-                    'platform': platform,
-                    'status': 'failed',
-                    'error': str(e)
-                })
+                }
+            })
+            social_account.needs_sync = True
+            
+            return {
+                'platform': platform,
+                'status': 'success',
+                'platform_post_id': result.get('post_id'),
+                'result': result
+            }
+            
+    except Exception as e:
+        if should_retry(self, e):
+            raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
+        
+        return {
+            'platform': platform,
+            'status': 'failed',
+            'error': str(e)
+        }
+
+
+@celery_app.task
+def finalize_post(results: List[dict], post_id: int, total_platforms: int, missing: List[dict] = None):
+    """Record the combined outcome of a multi-platform post"""
+    
+    results = list(missing or []) + list(results)
+    
+    with db_session() as db:
+        post = db.get(Post, post_id)
+        
+        if not post:
+            raise Exception("Post not found")
         
         # Update post status based on results
         success_count = sum(1 for r in results if r['status'] == 'success')
@@ -161,26 +316,15 @@ def post_to_multiple_platforms(self, post_id: int, platform_ids: List[str]):
         else:
             post.status = "failed"
         
-        # Store results in platform_data
-        post.platform_data = {'posting_results': results}
-        db.commit()
-        
-        return {
-            'post_id': post_id,
-            'results': results,
-            'success_count': success_count,
-            'total_platforms': total_platforms
-        }
-        
-    except Exception as e:
-        self.update_state(
-            state='FAILURE',
-            meta={'error': f'Multi-platform posting failed: {str(e)}'}
-        )
-        raise
+        # Store results in platform_data, keeping the per-platform publication records
+        merge_platform_data(db, post, {'posting_results': results})
     
-    finally:
-        db.close()
+    return {
+        'post_id': post_id,
+        'results': results,
+        'success_count': success_count,
+        'total_platforms': total_platforms
+    }
 
 
 @celery_app.task
@@ -188,58 +332,73 @@ def process_scheduled_posts():
     """Process posts that are scheduled to be posted now"""
     
     try:
-        db = SessionLocal()
-        
-        # Get posts scheduled for now (with 1-minute buffer)
-        now = datetime.now()
-        buffer_time = now + timedelta(minutes=1)
-        
-        scheduled_posts = db.query(Post).filter(
-            Post.status == "scheduled",
-            Post.scheduled_time <= buffer_time,
-            Post.scheduled_time >= now - timedelta(minutes=5)  # Don't process very old scheduled posts
-        ).all()
-        
-        processed_count = 0
-        
-        for post in scheduled_posts:
-            try:
-                # Get platform data
-                platform_data = post.platform_data or {}
-                platforms = platform_data.get('platforms', [])
-                
-                if platforms:
-                    # Post to multiple platforms
-                    post_to_multiple_platforms.delay(post.id, platforms)
-                else:
-                    # Default to user's first active social account
-                    social_account = db.query(SocialAccount).filter(
-                        SocialAccount.user_id == post.user_id,
+        with db_session() as db:
+            # Get posts scheduled for now (with 1-minute buffer)
+            now = datetime.now()
+            buffer_time = now + timedelta(minutes=1)
+            
+            scheduled_posts = db.query(Post).filter(
+                Post.status == "scheduled",
+                Post.scheduled_time <= buffer_time,
+                Post.scheduled_time >= now - timedelta(minutes=5)  # Don't process very old scheduled posts
+            ).all()
+            
+            # Default account (first active one) for every user with a due post, in one query
+            user_ids = {post.user_id for post in scheduled_posts}
+            default_accounts = {}
+            
+            if user_ids:
+                for account in db.execute(
+                    select(SocialAccount.user_id, SocialAccount.id, SocialAccount.platform).where(
+                        SocialAccount.user_id.in_(user_ids),
                         SocialAccount.is_active == True
-                    ).first()
+                    ).order_by(SocialAccount.user_id, SocialAccount.id)
+                ):
+                    default_accounts.setdefault(account.user_id, account)
+            
+            processed_count = 0
+            dispatches = []
+            failed_ids = []
+            
+            for post in scheduled_posts:
+                try:
+                    # Get platform data
+                    platform_data = post.platform_data or {}
+                    platforms = platform_data.get('platforms', [])
                     
-                    if social_account:
-                        post_to_platform.delay(post.id, social_account.platform, social_account.id)
-                
-                processed_count += 1
-                
-            except Exception as e:
-                print(f"Error processing scheduled post {post.id}: {e}")
-                post.status = "failed"
-                db.commit()
-        
-        return {
-            'processed_count': processed_count,
-            'timestamp': now,
-            'status': 'success'
-        }
-        
-    except Exception as e:
-        print(f"Error in process_scheduled_posts: {e}")
+                    if platforms:
+                        # Post to multiple platforms
+                        dispatches.append(post_to_multiple_platforms.s(post.id, platforms))
+                    else:
+                        # Default to user's first active social account
+                        social_account = default_accounts.get(post.user_id)
+                        
+                        if social_account:
+                            dispatches.append(post_to_platform.s(post.id, social_account.platform, social_account.id))
+                    
+                    processed_count += 1
+                    
+                except Exception:
+                    logger.exception("Error processing scheduled post %s", post.id)
+                    failed_ids.append(post.id)
+            
+            if failed_ids:
+                # One statement for all failures, committed with the session
+                db.execute(update(Post).where(Post.id.in_(failed_ids)).values(status="failed"))
+            
+            if dispatches:
+                # Publish every post task over one producer instead of a .delay() per post
+                group(dispatches).apply_async()
+            
+            return {
+                'processed_count': processed_count,
+                'timestamp': now,
+                'status': 'success'
+            }
+            
+    except Exception:
+        logger.exception("Error in process_scheduled_posts")
         raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task(bind=True)
@@ -247,93 +406,170 @@ def execute_schedule(self, schedule_id: int):
     """Execute a recurring schedule"""
     
     try:
-        db = SessionLocal()
-        schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
-        
-        if not schedule or not schedule.is_active:
-            return {'status': 'skipped', 'reason': 'Schedule not found or inactive'}
-        
-        # Get current content from queue
-        content_queue = schedule.content_queue or []
-        if not content_queue:
-            return {'status': 'skipped', 'reason': 'No content in queue'}
-        
-        current_index = schedule.current_index
-        if current_index >= len(content_queue):
-            current_index = 0  # Reset to beginning
-        
-        current_content = content_queue[current_index]
-        
-        # Create post from content
-        post = Post(
-            user_id=schedule.user_id,
-            title=current_content.get('title', ''),
-            description=current_content.get('description', ''),
-            file_path=current_content.get('file_path', ''),
-            file_type=current_content.get('file_type', 'image'),
-            scheduled_time=datetime.now(),
-            status="scheduled"
-        )
-        
-        db.add(post)
-        db.commit()
-        db.refresh(post)
-        
-        # Post to target platforms
-        target_platforms = schedule.target_platforms or []
-        if target_platforms:
-            post_to_multiple_platforms.delay(post.id, target_platforms)
-        
-        # Update schedule
-        schedule.current_index = (current_index + 1) % len(content_queue)
-        schedule.last_executed = datetime.now()
-        
-        # Calculate next execution time
-        schedule.next_execution = calculate_next_execution_time(schedule)
-        
-        db.commit()
-        
-        return {
-            'schedule_id': schedule_id,
-            'post_id': post.id,
-            'content_index': current_index,
-            'next_execution': schedule.next_execution,
-            'status': 'success'
-        }
-        
+        with db_session() as db:
+            now = datetime.now()
+            schedule = db.get(Schedule, schedule_id)
+            
+            if not schedule or not schedule.is_active:
+                return {'status': 'skipped', 'reason': 'Schedule not found or inactive'}
+            
+            # Get current content from queue
+            content_queue = schedule.content_queue or []
+            if not content_queue:
+                return {'status': 'skipped', 'reason': 'No content in queue'}
+            
+            current_index = schedule.current_index
+            if current_index >= len(content_queue):
+                current_index = 0  # Reset to beginning
+            
+            current_content = content_queue[current_index]
+            
+            # Create post from content
+            post = Post(
+                user_id=schedule.user_id,
+                title=current_content.get('title', ''),
+                description=current_content.get('description', ''),
+                file_path=current_content.get('file_path', ''),
+                file_type=current_content.get('file_type', 'image'),
+                scheduled_time=now,
+                status="scheduled"
+            )
+            
+            db.add(post)
+            db.commit()
+            db.refresh(post)
+            
+            # Post to target platforms
+            target_platforms = schedule.target_platforms or []
+            if target_platforms:
+                post_to_multiple_platforms.delay(post.id, target_platforms)
+            
+            # Update schedule
+            schedule.current_index = (current_index + 1) % len(content_queue)
+            schedule.last_executed = now
+            
+            # Calculate next execution time
+            schedule.next_execution = calculate_next_execution_time(schedule, now)
+            
+            return {
+                'schedule_id': schedule_id,
+                'post_id': post.id,
+                'content_index': current_index,
+                'next_execution': schedule.next_execution,
+                'status': 'success'
+            }
+            
     except Exception as e:
         self.update_state(
             state='FAILURE',
             meta={'error': f'Schedule execution failed: {str(e)}'}
         )
         raise
-    
-    finally:
-        db.close()
 
 
-def get_platform_service(platform: str, social_account):
-    """Get the appropriate service for a platform"""
+def get_platform_service(platform: str, social_account, file_path: str = None):
+    """Get the appropriate service for a platform
     
-    services = {
-        'instagram': InstagramService,
-        'facebook': FacebookService,
-        'twitter': TwitterService,
-        'youtube': YouTubeService,
-        'tiktok': TikTokService
-    }
+    When file_path is given, files the platform cannot handle are rejected
+    before the service (and its API client) is constructed.
+    """
     
-    service_class = services.get(platform)
+    service_class = _SERVICES.get(platform)
     if service_class:
+        if file_path and not service_class.can_handle(file_path):
+            raise Exception(f"{platform} does not support file: {file_path}")
         return service_class(social_account)
     
     return None
 
 
-def calculate_next_execution_time(schedule: Schedule) -> datetime:
-    """Calculate next execution time for a schedule"""
+def claim_post(db: Session, post_id: int) -> bool:
+    """Atomically move a post to "posting"; False if it is not in a claimable state"""
     
     now = datetime.now()
+    
+    claimed = db.execute(
+        update(Post)
+        .where(
+            Post.id == post_id,
+            or_(
+                Post.status.in_(CLAIMABLE_POST_STATUSES),
+                and_(Post.status == "posting", Post.updated_at < now - POSTING_CLAIM_TIMEOUT)
+            )
+        )
+        .values(status="posting", updated_at=now)
+        .returning(Post.id)
+    ).first()
+    
+    return claimed is not None
+
+
+def idempotency_key(post_id: int, platform: str, social_account_id: int) -> str:
+    """Stable key identifying one publish of a post to one account"""
+    return hashlib.sha256(f"{post_id}|{platform}|{social_account_id}".encode()).hexdigest()
+
+
+def post_content(service, platform: str, post: Post, idempotency_key: str = None) -> dict:
+    """Post through a platform service, guarded by the platform's circuit breaker"""
+    
+    breaker = get_breaker(platform)
+    
+    if not breaker.allow():
+        raise PlatformUnavailable(f"{platform} is unavailable after repeated failures")
+    
+    try:
+        result = service.post_content(
+            file_path=post.file_path,
+            caption=post.description,
+            title=post.title,
+            idempotency_key=idempotency_key
+        )
+    except Exception as e:
+        # Only outages count against the platform; bad files or tokens do not
+        if is_transient_error(e):
+            breaker.record_failure()
+        raise
+    
+    breaker.record_success()
+    return result
+
+
+def should_retry(task, error: Exception) -> bool:
+    """Retry transient failures until the task's retry budget is spent"""
+    return is_transient_error(error) and task.request.retries < task.max_retries
+
+
+def retry_countdown(retries: int) -> int:
+    """Exponential backoff with full jitter: up to 2, 4, 8, ... seconds, capped at a minute"""
+    return get_exponential_backoff_interval(RETRY_BACKOFF, retries, RETRY_BACKOFF_MAX, full_jitter=True)
+
+
+def merge_platform_data(db: Session, post: Post, data: dict):
+    """Merge keys into a post's platform_data
+    
+    On PostgreSQL this is a single jsonb || in the UPDATE, so concurrent
+    writers each add their keys instead of overwriting one another.
+    """
+    
+    if db.get_bind().dialect.name == 'postgresql':
+        db.execute(
+            text(
+                "UPDATE posts SET platform_data = "
+                "(COALESCE(platform_data::jsonb, '{}'::jsonb) || CAST(:data AS jsonb))::json "
+                "WHERE id = :id"
+            ),
+            {'id': post.id, 'data': json.dumps(data, default=str)}
+        )
+        db.expire(post, ['platform_data'])
+    else:
+        # Assign a new dict; in-place changes to a JSON column are not tracked
+        post.platform_data = {**(post.platform_data or {}), **data}
+
+
+def calculate_next_execution_time(schedule: Schedule, now: datetime = None) -> datetime:
+    """Calculate next execution time for a schedule, relative to now unless given"""
+    
+    now = now or datetime.now()
     schedule_data = schedule.schedule_data or {}
     
     if schedule.schedule_type == "daily":
@@ -1,69 +1,74 @@
-from celery import current_task
+from celery import group
+import logging
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
 from celery.schedules import crontab
+from redbeat import RedBeatSchedulerEntry
 
 from app.tasks.celery_app import celery_app
-from app.core.database import SessionLocal
+from app.core.database import db_session
 from app.models.models import Schedule, Post
-from app.tasks.posting_tasks import execute_schedule
+from app.tasks.posting_tasks import calculate_next_execution_time, execute_schedule, post_to_multiple_platforms
+
+
+logger = logging.getLogger(__name__)
+
+
+# How long a claimed schedule is held before another check may claim it again
+SCHEDULE_CLAIM_LEASE = timedelta(hours=1)
 
 
 @celery_app.task(bind=True)
-def schedule_post_task(self, post_id: int, platform_ids: list, scheduled_time: datetime):
+def schedule_post_task(self, post_id: int, platform_ids: list, scheduled_time_iso: str):
     """Schedule a post for future posting"""
     
     try:
-        db = SessionLocal()
-        post = db.query(Post).filter(Post.id == post_id).first()
-        
-        if not post:
-            raise Exception("Post not found")
+        # Arguments travel as JSON, so the time comes in as an ISO 8601 string
+        scheduled_time = datetime.fromisoformat(scheduled_time_iso)
         
-        # Calculate delay until scheduled time
-        now = datetime.now()
-        if scheduled_time <= now:
-            # Post immediately if scheduled time is in the past
-            from app.tasks.posting_tasks import post_to_multiple_platforms
-            post_to_multiple_platforms.delay(post_id, platform_ids)
+        with db_session() as db:
+            post = db.get(Post, post_id)
+            
+            if not post:
+                raise Exception("Post not found")
+            
+            # Calculate delay until scheduled time
+            now = datetime.now()
+            if scheduled_time <= now:
+                # Post immediately if scheduled time is in the past
+                post_to_multiple_platforms.delay(post_id, platform_ids)
+                
+                return {
+                    'post_id': post_id,
+                    'status': 'posted_immediately',
+                    'scheduled_time': scheduled_time_iso
+                }
+            
+            # Schedule for future posting
+            delay_seconds = (scheduled_time - now).total_seconds()
+            
+            # Use Celery's eta (estimated time of arrival) to schedule the task
+            post_to_multiple_platforms.apply_async(
+                args=[post_id, platform_ids],
+                eta=scheduled_time
+            )
             
+            # Update post status
+            post.status = "scheduled"
+            post.scheduled_time = scheduled_time
             return {
                 'post_id': post_id,
-                'status': 'posted_immediately',
-                'scheduled_time': scheduled_time
+                'status': 'scheduled',
+                'scheduled_time': scheduled_time_iso,
+                'delay_seconds': delay_seconds
             }
-        
-        # Schedule for future posting
-        delay_seconds = (scheduled_time - now).total_seconds()
-        
-        # Use Celery's eta (estimated time of arrival) to schedule the task
-        from app.tasks.posting_tasks import post_to_multiple_platforms
-        post_to_multiple_platforms.apply_async(
-            args=[post_id, platform_ids],
-            eta=scheduled_time
-        )
-        
-        # Update post status
-        post.status = "scheduled"
-        post.scheduled_time = scheduled_time
-        db.commit()
-        
-        return {
-            'post_id': post_id,
-            'status': 'scheduled',
-            'scheduled_time': scheduled_time,
-            'delay_seconds': delay_seconds
-        }
-        
+            
     except Exception as e:
         self.update_state(
             state='FAILURE',
             meta={'error': f'Scheduling failed: {str(e)}'}
         )
         raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task(bind=True)
@@ -71,66 +76,66 @@ def create_recurring_schedule(self, schedule_id: int):
     """Set up recurring schedule using Celery Beat"""
     
     try:
-        db = SessionLocal()
-        schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
-        
-        if not schedule:
-            raise Exception("Schedule not found")
-        
-        # Create dynamic periodic task
-        task_name = f"schedule_{schedule_id}"
-        
-        if schedule.schedule_type == "daily":
-            time_str = schedule.schedule_data.get("time", "09:00")
-            hour, minute = map(int, time_str.split(":"))
+        with db_session() as db:
+            schedule = db.get(Schedule, schedule_id)
             
-            celery_app.conf.beat_schedule[task_name] = {
-                'task': 'app.tasks.posting_tasks.execute_schedule',
-                'schedule': crontab(hour=hour, minute=minute),
-                'args': (schedule_id,)
-            }
+            if not schedule:
+                raise Exception("Schedule not found")
             
-        elif schedule.schedule_type == "weekly":
-            day_of_week = schedule.schedule_data.get("day_of_week", 1)
-            time_str = schedule.schedule_data.get("time", "09:00")
-            hour, minute = map(int, time_str.split(":"))
+            # Create dynamic periodic task
+            task_name = beat_entry_name(schedule_id)
+            cron = None
             
-            celery_app.conf.beat_schedule[task_name] = {
-                'task': 'app.tasks.posting_tasks.execute_schedule',
-                'schedule': crontab(hour=hour, minute=minute, day_of_week=day_of_week),
-                'args': (schedule_id,)
-            }
+            if schedule.schedule_type == "daily":
+                time_str = schedule.schedule_data.get("time", "09:00")
+                hour, minute = map(int, time_str.split(":"))
+                
+                cron = crontab(hour=hour, minute=minute)
+                
+            elif schedule.schedule_type == "weekly":
+                day_of_week = schedule.schedule_data.get("day_of_week", 1)
+                time_str = schedule.schedule_data.get("time", "09:00")
+                hour, minute = map(int, time_str.split(":"))
+                
+                cron = crontab(hour=hour, minute=minute, day_of_week=day_of_week)
+                
+            elif schedule.schedule_type == "monthly":
+                day_of_month = schedule.schedule_data.get("day_of_month", 1)
+                time_str = schedule.schedule_data.get("time", "09:00")
+                hour, minute = map(int, time_str.split(":"))
+                
+                cron = crontab(hour=hour, minute=minute, day_of_month=day_of_month)
+            
+            if cron is None:
+                return {
+                    'schedule_id': schedule_id,
+                    'schedule_type': schedule.schedule_type,
+                    'status': 'skipped',
+                    'reason': 'Schedule type has no recurring beat entry'
+                }
             
-        elif schedule.schedule_type == "monthly":
-            day_of_month = schedule.schedule_data.get("day_of_month", 1)
-            time_str = schedule.schedule_data.get("time", "09:00")
-            hour, minute = map(int, time_str.split(":"))
+            # Store the entry in Redis, where the beat process picks it up
+            RedBeatSchedulerEntry(
+                task_name,
+                'app.tasks.posting_tasks.execute_schedule',
+                cron,
+                args=(schedule_id,),
+                app=celery_app
+            ).save()
             
-            celery_app.conf.beat_schedule[task_name] = {
-                'task': 'app.tasks.posting_tasks.execute_schedule',
-                'schedule': crontab(hour=hour, minute=minute, day_of_month=day_of_month),
-                'args': (schedule_id,)
+            return {
+                'schedule_id': schedule_id,
+                'task_name': task_name,
+                'schedule_type': schedule.schedule_type,
+                'status': 'created'
             }
-        
-        # Update Celery configuration
-        celery_app.control.add_consumer(task_name)
-        
-        return {
-            'schedule_id': schedule_id,
-            'task_name': task_name,
-            'schedule_type': schedule.schedule_type,
-            'status': 'created'
-        }
-        
+            
     except Exception as e:
         self.update_state(
             state='FAILURE',
             meta={'error': f'Recurring schedule creation failed: {str(e)}'}
         )
         raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task
@@ -138,38 +143,32 @@ def check_and_execute_schedules():
     """Check for schedules that need to be executed"""
     
     try:
-        db = SessionLocal()
-        
-        # Get schedules that are due for execution
-        now = datetime.now()
-        due_schedules = db.query(Schedule).filter(
-            Schedule.is_active == True,
-            Schedule.next_execution <= now
-        ).all()
-        
-        executed_count = 0
-        
-        for schedule in due_schedules:
-            try:
-                # Execute the schedule
-                execute_schedule.delay(schedule.id)
-                executed_count += 1
-                
-            except Exception as e:
-                print(f"Error executing schedule {schedule.id}: {e}")
+        with db_session() as db:
+            # Claim due schedules in one statement: pushing next_execution out
+            # means a concurrent or overlapping run cannot pick them up again.
+            # execute_schedule sets the real next time; if it fails, the
+            # schedule is retried after the lease.
+            now = datetime.now()
+            due_ids = db.scalars(
+                update(Schedule)
+                .where(Schedule.is_active == True, Schedule.next_execution <= now)
+                .values(next_execution=now + SCHEDULE_CLAIM_LEASE)
+                .returning(Schedule.id)
+            ).all()
+        
+        if due_ids:
+            # Execute the schedules, published together
+            group(execute_schedule.s(schedule_id) for schedule_id in due_ids).apply_async()
         
         return {
-            'executed_count': executed_count,
-            'total_due': len(due_schedules),
+            'executed_count': len(due_ids),
+            'total_due': len(due_ids),
             'timestamp': now
         }
         
-    except Exception as e:
-        print(f"Error in check_and_execute_schedules: {e}")
+    except Exception:
+        logger.exception("Error in check_and_execute_schedules")
         raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task(bind=True)
@@ -177,46 +176,61 @@ def bulk_schedule_posts(self, post_ids: list, schedule_config: dict):
     """Schedule multiple posts with different timing"""
     
     try:
-        db = SessionLocal()
-        
         scheduled_posts = []
         failed_posts = []
+        dispatches = []
         
         base_time = datetime.fromisoformat(schedule_config.get('start_time'))
         interval_minutes = schedule_config.get('interval_minutes', 60)
         platforms = schedule_config.get('platforms', [])
         
-        for i, post_id in enumerate(post_ids):
-            try:
-                # Calculate scheduled time for this post
-                scheduled_time = base_time + timedelta(minutes=i * interval_minutes)
+        total = len(post_ids)
+        times = [base_time + timedelta(minutes=i * interval_minutes) for i in range(total)]
+        progress_step = max(1, total // 20)  # Report progress every 5%
+        now = datetime.now()
+        
+        with db_session() as db:
+            existing_ids = set(db.scalars(select(Post.id).where(Post.id.in_(post_ids))))
+            future_posts = []
+            
+            for i, (post_id, scheduled_time) in enumerate(zip(post_ids, times)):
+                if i % progress_step == 0:
+                    self.update_state(
+                        state='PROGRESS',
+                        meta={
+                            'progress': int((i / total) * 100),
+                            'current': i + 1,
+                            'total': total,
+                            'status': f'Scheduling post {post_id}...'
+                        }
+                    )
+                
+                if post_id not in existing_ids:
+                    failed_posts.append({
+                        'post_id': post_id,
+                        'error': 'Post not found'
+                    })
+                    continue
                 
-                # Update progress
-                progress = int((i / len(post_ids)) * 100)
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'progress': progress,
-                        'current': i + 1,
-                        'total': len(post_ids),
-                        'status': f'Scheduling post {post_id}...'
-                    }
-                )
+                # Celery holds the task until its eta; past times run right away
+                dispatches.append(post_to_multiple_platforms.s(post_id, platforms).set(eta=scheduled_time))
                 
-                # Schedule the post
-                schedule_post_task.delay(post_id, platforms, scheduled_time)
+                if scheduled_time > now:
+                    future_posts.append({'id': post_id, 'status': 'scheduled', 'scheduled_time': scheduled_time})
                 
                 scheduled_posts.append({
                     'post_id': post_id,
-                    'scheduled_time': scheduled_time,
+                    'scheduled_time': scheduled_time.isoformat(),
                     'platforms': platforms
                 })
-                
-            except Exception as e:
-                failed_posts.append({
-                    'post_id': post_id,
-                    'error': str(e)
-                })
+            
+            # Record the new times for every post in one executemany
+            if future_posts:
+                db.execute(update(Post), future_posts)
+        
+        if dispatches:
+            # Publish every post task at once instead of a schedule_post_task hop per post
+            group(dispatches).apply_async()
         
         return {
             'scheduled_posts': scheduled_posts,
@@ -231,18 +245,14 @@ def bulk_schedule_posts(self, post_ids: list, schedule_config: dict):
             meta={'error': f'Bulk scheduling failed: {str(e)}'}
         )
         raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task
 def update_schedule_queue(schedule_id: int, new_content: list):
     """Update the content queue for a schedule"""
     
-    try:
-        db = SessionLocal()
-        schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+    with db_session() as db:
+        schedule = db.get(Schedule, schedule_id)
         
         if not schedule:
             raise Exception("Schedule not found")
@@ -254,30 +264,20 @@ def update_schedule_queue(schedule_id: int, new_content: list):
         if schedule.current_index >= len(new_content):
             schedule.current_index = 0
         
-        db.commit()
-        
         return {
             'schedule_id': schedule_id,
             'content_count': len(new_content),
             'current_index': schedule.current_index,
             'status': 'updated'
         }
-        
-    except Exception as e:
-        db.rollback()
-        raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task
 def pause_schedule(schedule_id: int):
     """Pause a recurring schedule"""
     
-    try:
-        db = SessionLocal()
-        schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+    with db_session() as db:
+        schedule = db.get(Schedule, schedule_id)
         
         if not schedule:
             raise Exception("Schedule not found")
@@ -287,30 +287,20 @@ def pause_schedule(schedule_id: int):
         db.commit()
         
         # Remove from Celery Beat schedule
-        task_name = f"schedule_{schedule_id}"
-        if task_name in celery_app.conf.beat_schedule:
-            del celery_app.conf.beat_schedule[task_name]
+        remove_beat_entry(schedule_id)
         
         return {
             'schedule_id': schedule_id,
             'status': 'paused'
         }
-        
-    except Exception as e:
-        db.rollback()
-        raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task
 def resume_schedule(schedule_id: int):
     """Resume a paused schedule"""
     
-    try:
-        db = SessionLocal()
-        schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+    with db_session() as db:
+        schedule = db.get(Schedule, schedule_id)
         
         if not schedule:
             raise Exception("Schedule not found")
@@ -319,7 +309,6 @@ def resume_schedule(schedule_id: int):
         schedule.is_active = True
         
         # Recalculate next execution time
-        from app.tasks.posting_tasks import calculate_next_execution_time
         schedule.next_execution = calculate_next_execution_time(schedule)
         
         db.commit()
@@ -332,22 +321,13 @@ def resume_schedule(schedule_id: int):
             'next_execution': schedule.next_execution,
             'status': 'resumed'
         }
-        
-    except Exception as e:
-        db.rollback()
-        raise
-    
-    finally:
-        db.close()
 
 
 @celery_app.task
 def cleanup_completed_schedules():
     """Clean up completed one-time schedules"""
     
-    try:
-        db = SessionLocal()
-        
+    with db_session() as db:
         # Find completed one-time schedules
         now = datetime.now()
         completed_schedules = db.query(Schedule).filter(
@@ -360,24 +340,23 @@ def cleanup_completed_schedules():
         
         for schedule in completed_schedules:
             # Remove from Celery Beat schedule
-            task_name = f"schedule_{schedule.id}"
-            if task_name in celery_app.conf.beat_schedule:
-                del celery_app.conf.beat_schedule[task_name]
+            remove_beat_entry(schedule.id)
             
             # Delete schedule
             db.delete(schedule)
             deleted_count += 1
         
-        db.commit()
-        
         return {
             'deleted_count': deleted_count,
             'timestamp': now
         }
-        
-    except Exception as e:
-        db.rollback()
-        raise
-    
-    finally:
-        db.close()
\ No newline at end of file
+
+
+def beat_entry_name(schedule_id: int) -> str:
+    """Name of a schedule's RedBeat entry"""
+    return f"schedule_{schedule_id}"
+
+
+def remove_beat_entry(schedule_id: int):
+    """Delete a schedule's RedBeat entry; a missing entry is ignored"""
+    RedBeatSchedulerEntry(beat_entry_name(schedule_id), app=celery_app).delete()
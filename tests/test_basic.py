@@ -67,10 +67,280 @@ def test_caption_formatting():
     assert "#cool" in formatted
     assert "#trending" in formatted
 
+def test_youtube_client_is_lazy():
+    """Test that the YouTube API client is only built on first use"""
+    from app.services.youtube_service import YouTubeService
+    from unittest.mock import Mock
+    
+    service = YouTubeService(Mock())
+    
+    assert 'youtube' not in service.__dict__
+    assert service.get_optimal_posting_times()
+    assert 'youtube' not in service.__dict__
+
+def test_youtube_token_refresh_is_skipped_when_valid():
+    """Test that a token with time left is not refreshed"""
+    from app.services.youtube_service import YouTubeService
+    from datetime import datetime, timedelta
+    from unittest.mock import Mock
+    
+    account = Mock(token_expires_at=datetime.utcnow() + timedelta(minutes=50))
+    service = YouTubeService(account)
+    service._refresh_token = Mock(return_value=True)
+    
+    assert service._ensure_valid_token()
+    service._refresh_token.assert_not_called()
+    
+    account.token_expires_at = datetime.utcnow() + timedelta(seconds=30)
+    service._ensure_valid_token()
+    service._refresh_token.assert_called_once()
+
+def test_youtube_can_handle():
+    """Test the YouTube pre-check used before building the service"""
+    from app.services.youtube_service import YouTubeService
+    
+    assert YouTubeService.can_handle("clip.mp4")
+    assert YouTubeService.can_handle("clip.MOV")
+    assert not YouTubeService.can_handle("photo.jpg")
+    assert not YouTubeService.can_handle("notes.txt")
+
+def test_circuit_breaker_transitions():
+    """Test that the circuit breaker opens, half-opens and closes"""
+    from app.services.circuit_breaker import CircuitBreaker
+    from unittest.mock import patch
+    
+    with patch('app.services.circuit_breaker.time.monotonic', return_value=1000):
+        breaker = CircuitBreaker('test', error_threshold=2, recovery_window=60)
+        
+        # Closed until the threshold is reached
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+    
+    # Half-open after the recovery window: one trial call, the rest held off
+    with patch('app.services.circuit_breaker.time.monotonic', return_value=1060):
+        assert breaker.allow()
+        assert not breaker.allow()
+        
+        # A failed trial reopens the circuit
+        breaker.record_failure()
+        assert not breaker.allow()
+    
+    # A successful trial closes it
+    with patch('app.services.circuit_breaker.time.monotonic', return_value=1120):
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.allow()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.allow()
+
+def test_transient_error_cause_chain():
+    """Test that transient errors are found behind wrapping exceptions"""
+    import requests
+    from app.services.base_service import RateLimitError, is_transient_error
+    
+    def wrapped(error, explicit=True):
+        try:
+            try:
+                raise error
+            except Exception as e:
+                if explicit:
+                    raise Exception(f"API request failed: {str(e)}") from e
+                raise Exception(f"API request failed: {str(e)}")
+        except Exception as e:
+            return e
+    
+    def http_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.exceptions.HTTPError(response=response)
+    
+    assert is_transient_error(wrapped(requests.exceptions.ConnectionError("reset")))
+    assert is_transient_error(wrapped(requests.exceptions.Timeout("timed out"), explicit=False))
+    assert is_transient_error(wrapped(wrapped(RateLimitError(30))))
+    assert is_transient_error(wrapped(http_error(503)))
+    assert not is_transient_error(wrapped(http_error(400)))
+    assert not is_transient_error(wrapped(ValueError("bad caption")))
+
+def test_add_months_rolls_over_years():
+    """Test month arithmetic across year boundaries"""
+    from app.core.partitions import add_months, partition_name
+    from datetime import date
+    
+    assert add_months(date(2024, 11, 1), 1) == date(2024, 12, 1)
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert add_months(date(2024, 1, 1), 24) == date(2026, 1, 1)
+    assert partition_name('analytics', date(2025, 1, 1)) == 'analytics_p2025_01'
+
+def test_expired_partitions_cutoff():
+    """Test that only partitions entirely before the retention cutoff expire"""
+    from app.core import partitions
+    from datetime import date, datetime
+    from unittest.mock import Mock, patch
+    
+    months = [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+    
+    with patch.object(partitions, 'list_partitions', return_value=months):
+        # A cutoff inside January keeps January's partition
+        assert partitions.expired_partitions(Mock(), 'analytics', datetime(2025, 1, 15)) == [
+            'analytics_p2024_11', 'analytics_p2024_12'
+        ]
+        
+        # On the first of the month the previous month is entirely expired
+        assert partitions.expired_partitions(Mock(), 'analytics', datetime(2025, 2, 1)) == [
+            'analytics_p2024_11', 'analytics_p2024_12', 'analytics_p2025_01'
+        ]
+        
+        assert partitions.expired_partitions(Mock(), 'analytics', datetime(2024, 11, 30)) == []
+
+def test_multi_platform_post_is_claimed_once():
+    """Test that a second dispatch of a multi-platform post is skipped"""
+    import app.core.database as database
+    import app.tasks.posting_tasks as posting_tasks
+    from app.models.models import Post, SocialAccount, User
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import scoped_session, sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from unittest.mock import Mock, patch
+    
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(engine)
+    session_factory = scoped_session(sessionmaker(bind=engine, autoflush=False, expire_on_commit=False))
+    
+    db = session_factory()
+    user = User(email='user@example.com', hashed_password='x')
+    db.add(user)
+    db.flush()
+    account = SocialAccount(user_id=user.id, platform='youtube', access_token='token', is_active=True)
+    db.add(account)
+    db.flush()
+    post = Post(user_id=user.id, social_account_id=account.id, title='Post', status='scheduled')
+    db.add(post)
+    db.commit()
+    post_id = post.id
+    session_factory.remove()
+    
+    task = posting_tasks.post_to_multiple_platforms
+    chord = Mock(return_value=Mock(return_value=Mock(id='finalize')))
+    
+    with patch.object(database, 'SessionScoped', session_factory), \
+         patch.object(posting_tasks, 'chord', chord), \
+         patch.object(task, 'update_state'):
+        assert task.run(post_id, ['youtube'])['status'] == 'dispatched'
+        assert task.run(post_id, ['youtube'])['status'] == 'skipped'
+    
+    chord.assert_called_once()
+    assert session_factory().get(Post, post_id).status == 'posting'
+
+def test_youtube_dashboard_fans_out_concurrently():
+    """Test that the dashboard requests run at the same time"""
+    import asyncio
+    from app.services import youtube_async
+    from unittest.mock import patch
+    
+    async def run():
+        started = 0
+        all_started = asyncio.Event()
+        
+        async def fetch(result):
+            # Only returns once every request is in flight, so sequential awaits would time out
+            nonlocal started
+            started += 1
+            if started == 4:
+                all_started.set()
+            await asyncio.wait_for(all_started.wait(), timeout=1)
+            return result
+        
+        with patch.object(youtube_async, 'aget_account_metrics', lambda token: fetch({'followers': 10})), \
+             patch.object(youtube_async, 'aget_posts_analytics', lambda token, limit: fetch([{'post_id': 'a'}])), \
+             patch.object(youtube_async, 'aget_video_analytics', lambda token, video_id: fetch({'video_id': video_id})):
+            return await youtube_async.aget_dashboard('token', video_ids=['a', 'b'])
+    
+    assert asyncio.run(run()) == {
+        'account_metrics': {'followers': 10},
+        'posts_analytics': [{'post_id': 'a'}],
+        'videos': [{'video_id': 'a'}, {'video_id': 'b'}]
+    }
+
+def test_youtube_async_posts_analytics_uses_uploads_playlist():
+    """Test that recent videos come from the uploads playlist, not search.list"""
+    import asyncio
+    from app.services import youtube_async
+    from unittest.mock import patch
+    
+    responses = {
+        'channels': {'items': [{'contentDetails': {'relatedPlaylists': {'uploads': 'UU1'}}}]},
+        'playlistItems': {'items': [{'contentDetails': {'videoId': 'v1'}}]},
+        'videos': {'items': []}
+    }
+    endpoints = []
+    
+    async def api_get(access_token, endpoint, params):
+        endpoints.append(endpoint)
+        return responses[endpoint]
+    
+    with patch.object(youtube_async, 'api_get', api_get):
+        assert asyncio.run(youtube_async.aget_posts_analytics('token')) == []
+    
+    assert endpoints == ['channels', 'playlistItems', 'videos']
+
+def test_youtube_token_without_expiry_is_refreshed_once():
+    """Test that a token with no stored expiry is refreshed at most once"""
+    from app.services import youtube_service
+    from unittest.mock import Mock, patch
+    
+    # Without a refresh token there is nothing to refresh with
+    account = Mock(token_expires_at=None, refresh_token=None)
+    service = youtube_service.YouTubeService(account)
+    service._refresh_token = Mock(return_value=False)
+    
+    assert service._ensure_valid_token()
+    service._refresh_token.assert_not_called()
+    
+    # A refresh that reports no expiry still stores one
+    account = Mock(token_expires_at=None, refresh_token='refresh')
+    service = youtube_service.YouTubeService(account)
+    credentials = Mock(token='new-token', expiry=None)
+    
+    with patch.object(youtube_service, 'Credentials', return_value=credentials):
+        assert service._ensure_valid_token()
+        assert service._ensure_valid_token()
+    
+    credentials.refresh.assert_called_once()
+    assert account.token_expires_at is not None
+    assert service.access_token == 'new-token'
+    
+    # A failed refresh stops the call instead of using the stale token
+    account = Mock(token_expires_at=None, refresh_token='refresh')
+    service = youtube_service.YouTubeService(account)
+    service._refresh_token = Mock(return_value=False)
+    
+    try:
+        service._ensure_valid_token()
+        assert False, "Expected the failed refresh to raise"
+    except Exception as e:
+        assert "could not be refreshed" in str(e)
+    assert not service.refresh_token_if_needed()
+
 if __name__ == "__main__":
     test_imports()
     test_config_loading()
     test_file_type_detection()
     test_engagement_calculation()
     test_caption_formatting()
+    test_youtube_client_is_lazy()
+    test_youtube_token_refresh_is_skipped_when_valid()
+    test_youtube_can_handle()
+    test_circuit_breaker_transitions()
+    test_transient_error_cause_chain()
+    test_add_months_rolls_over_years()
+    test_expired_partitions_cutoff()
+    test_multi_platform_post_is_claimed_once()
+    test_youtube_dashboard_fans_out_concurrently()
+    test_youtube_async_posts_analytics_uses_uploads_playlist()
+    test_youtube_token_without_expiry_is_refreshed_once()
     print("All basic tests passed!")
\ No newline at end of file